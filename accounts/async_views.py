@@ -0,0 +1,39 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import render
+
+from blog.models import Post
+from .models import Profile
+
+
+async def _recent_posts(username):
+    return [post async for post in Post.published.filter(author__username=username)[:4]]
+
+
+async def profile_detail_view(request, username):
+    """
+    Asynchronous version of views.profile_detail_view.
+
+    The profile and the recent posts are both looked up by username, so the
+    two queries run concurrently.
+
+    Args:
+    - request: HttpRequest object.
+    - username: Username of the profile to be displayed.
+
+    Returns:
+    - HttpResponse: Rendered template with user profile details.
+    """
+    profile, posts = await asyncio.gather(
+        Profile.objects.select_related('user').filter(user__username=username).afirst(),
+        _recent_posts(username),
+    )
+    if profile is None:
+        raise Http404('No Profile matches the given query.')
+    context = {
+        'profile': profile,
+        'posts': posts
+    }
+    return await sync_to_async(render)(request, 'accounts/profile/detail.html', context)
@@ -1,6 +1,9 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .models import Profile
+
 
 class ProfileCompletionMiddleware:
     """
@@ -8,14 +11,19 @@ class ProfileCompletionMiddleware:
 
     This middleware checks if a user is authenticated and has a profile.
     If the user is authenticated but doesn't have a profile, it redirects
-    them to create a profile.
+    them to create a profile. It runs natively in both WSGI and ASGI
+    request handling, without a thread switch around async views.
 
     Attributes:
     - get_response: The next middleware in the chain or the view.
     """
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
         """
@@ -28,6 +36,9 @@ class ProfileCompletionMiddleware:
         Returns:
         - response: The HTTP response.
         """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         if request.user.is_authenticated and not hasattr(request.user, 'profile'):
             create_profile_url = reverse('accounts:profile_create')
             if request.path != create_profile_url:
@@ -35,3 +46,17 @@ class ProfileCompletionMiddleware:
 
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        """
+        Asynchronous version of __call__, the user and profile are read with the async ORM.
+        """
+        user = await request.auser()
+        # Django 5.0 caches request.user apart from auser(), templates would load the user again.
+        request.user = user
+        if user.is_authenticated and not await Profile.objects.filter(user=user).aexists():
+            create_profile_url = reverse('accounts:profile_create')
+            if request.path != create_profile_url:
+                return redirect(create_profile_url)
+
+        return await self.get_response(request)
@@ -1,7 +1,12 @@
+from django.conf import settings
 from django.urls import path
 
 from accounts import views
 
+profile_detail_view = views.profile_detail_view
+if settings.BLOG_ASYNC_VIEWS:
+    from accounts.async_views import profile_detail_view
+
 
 app_name = 'accounts'
 
@@ -15,6 +20,6 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('create-profile/', views.profile_create_view, name='profile_create'),
-    path('profile/<str:username>/show/', views.profile_detail_view, name='profile_detail'),
+    path('profile/<str:username>/show/', profile_detail_view, name='profile_detail'),
     path('profile/<str:username>/update/', views.profile_update_view, name='profile_update'),
 ]
@@ -6,6 +6,7 @@ from django.contrib.auth import get_user_model, login, authenticate, logout
 from django.contrib import messages
 
 from blog.models import Post
+from core.metrics import REGISTRATIONS
 from .forms import (
     RegisterForm,
     LoginForm,
@@ -46,6 +47,7 @@ def register_view(request):
             user = form.save(commit=False)
             user.is_active = False
             user.save()
+            REGISTRATIONS.inc()
 
             user_token = ActivationToken.objects.create(user=user)
             send_activation_email(user, user_token, request)
@@ -315,7 +317,7 @@ def profile_detail_view(request, username):
     Returns:
     - HttpResponse: Rendered template with user profile details.
     """
-    profile = get_object_or_404(Profile, user__username=username)
+    profile = get_object_or_404(Profile.objects.select_related('user'), user__username=username)
     posts = Post.published.filter(author=profile.user)[:4]
     context = {
         'profile': profile,
@@ -3,11 +3,9 @@ from django.contrib import admin
 from .models import (
     Category,
     Post,
-    PostLike,
-    PostDislike,
+    PostVote,
     Comment,
-    CommentLike,
-    CommentDislike
+    CommentVote
 )
 
 
@@ -45,28 +43,26 @@ class PostAdmin(admin.ModelAdmin):
     raw_id_fields = ('author',)
 
 
-@admin.register(PostLike)
-class PostLikeAdmin(admin.ModelAdmin):
+@admin.register(PostVote)
+class PostVoteAdmin(admin.ModelAdmin):
     """
-    Admin view for PostLike model.
+    Admin view for PostVote model.
 
-    Displays post and user fields in the list view.
+    Displays post, user and value fields in the list view.
+    Allows filtering by value.
     Supports searching by post author's and user's usernames.
+    Votes can only be deleted here, because stored counters are kept in sync
+    by the voting views and by deletion signals.
     """
-    list_display = ('post', 'user')
+    list_display = ('post', 'user', 'value', 'updated')
+    list_filter = ('value',)
     search_fields = ('post__author__username', 'user__username')
 
+    def has_add_permission(self, request):
+        return False
 
-@admin.register(PostDislike)
-class PostDislikeAdmin(admin.ModelAdmin):
-    """
-    Admin view for PostDislike model.
-
-    Displays post and user fields in the list view.
-    Supports searching by post author's and user's usernames.
-    """
-    list_display = ('post', 'user')
-    search_fields = ('post__author__username', 'user__username')
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Comment)
@@ -91,25 +87,23 @@ class CommentAdmin(admin.ModelAdmin):
         queryset.update(active=False)
 
 
-@admin.register(CommentLike)
-class CommentLikeAdmin(admin.ModelAdmin):
+@admin.register(CommentVote)
+class CommentVoteAdmin(admin.ModelAdmin):
     """
-    Admin view for CommentLike model.
+    Admin view for CommentVote model.
 
-    Displays comment and user fields in the list view.
+    Displays comment, user and value fields in the list view.
+    Allows filtering by value.
     Supports searching by comment author's and user's usernames.
+    Votes can only be deleted here, because stored counters are kept in sync
+    by the voting views and by deletion signals.
     """
-    list_display = ('comment', 'user')
+    list_display = ('comment', 'user', 'value', 'updated')
+    list_filter = ('value',)
     search_fields = ('comment__author__username', 'user__username')
 
+    def has_add_permission(self, request):
+        return False
 
-@admin.register(CommentDislike)
-class CommentDislikeAdmin(admin.ModelAdmin):
-    """
-    Admin view for CommentDislike model.
-
-    Displays comment and user fields in the list view.
-    Supports searching by comment author's and user's usernames.
-    """
-    list_display = ('comment', 'user')
-    search_fields = ('comment__author__username', 'user__username')
+    def has_change_permission(self, request, obj=None):
+        return False
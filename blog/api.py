@@ -0,0 +1,295 @@
+from collections import namedtuple
+
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Substr
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import tag_response, post_tag, category_tag, author_tag, NAVIGATION_TAG, POST_LIST_TAG
+from .conditional import conditional_page, navigation_validators, post_list_validators, post_validators
+from .decorators import cache_anonymous_page
+from .managers import PostQuerySet
+from .models import Category, Post, Comment, User
+from .utils import paginate_cursor
+
+PAGE_SIZE = 20
+
+# A field computed in Python from the looked up columns it needs.
+Computed = namedtuple('Computed', 'needs function')
+
+
+def _post_url(row):
+    publish = timezone.localtime(row['publish'])
+    return reverse('blog:post_detail', args=[publish.year, publish.month, publish.day, row['slug']])
+
+
+# Fields a caller may request, mapped to a lookup, an expression or a
+# Computed field. Only the columns of the requested fields are selected.
+POST_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'url': Computed(('publish', 'slug'), _post_url),
+    'excerpt': Substr('body', 1, PostQuerySet.EXCERPT_LENGTH),
+    'body': 'body',
+    'publish': 'publish',
+    'updated': 'updated',
+    'image_url': 'image_url',
+    'author': 'author__username',
+    'category': 'category__slug',
+    'likes': 'likes_count',
+    'dislikes': 'dislikes_count',
+    'comments': 'comments_count',
+}
+POST_LIST_DEFAULT = ('id', 'title', 'url', 'excerpt', 'publish', 'author', 'category',
+                     'likes', 'dislikes', 'comments')
+POST_DETAIL_DEFAULT = ('id', 'title', 'url', 'body', 'publish', 'updated', 'image_url', 'author', 'category',
+                       'likes', 'dislikes', 'comments')
+
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'body': 'body',
+    'created': 'created',
+    'updated': 'updated',
+    'likes': 'likes_count',
+    'dislikes': 'dislikes_count',
+}
+
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+}
+
+AUTHOR_FIELDS = {
+    'id': 'id',
+    'username': 'username',
+}
+
+# Columns read in cursor order, the paginator needs them in every row.
+POST_ORDERING = ('publish', 'created', 'id')
+COMMENT_ORDERING = ('updated', 'created', 'id')
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _requested_fields(request, spec, default):
+    """
+    Return the field names listed in the fields GET parameter, or the defaults.
+
+    Raises:
+        ValueError: If a requested field does not exist.
+    """
+    value = request.GET.get('fields')
+    if not value:
+        return default
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in spec]
+    if unknown or not names:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}; choose from {", ".join(spec)}')
+    return names
+
+
+def project(queryset, spec, names, needs=()):
+    """
+    Select only the columns of the requested fields.
+
+    Args:
+        queryset (QuerySet): Rows to read.
+        spec (dict): Field specification, e.g. POST_FIELDS.
+        names (tuple): Requested field names.
+        needs (tuple): Extra lookups the caller reads, e.g. the cursor ordering.
+
+    Returns:
+        QuerySet: Dictionaries holding the looked up columns and expressions.
+    """
+    lookups = dict.fromkeys(needs)
+    expressions = {}
+    for name in names:
+        source = spec[name]
+        if isinstance(source, str):
+            lookups[source] = None
+        elif isinstance(source, Computed):
+            lookups.update(dict.fromkeys(source.needs))
+        else:
+            expressions[name] = source
+    return queryset.values(*lookups, **expressions)
+
+
+def serialize(row, spec, names):
+    """
+    Turn a projected row into the requested fields, in the requested order.
+    """
+    data = {}
+    for name in names:
+        source = spec[name]
+        if isinstance(source, str):
+            data[name] = row[source]
+        elif isinstance(source, Computed):
+            data[name] = source.function(row)
+        else:
+            data[name] = row[name]
+    return data
+
+
+def _page_response(request, page, spec, names):
+    return JsonResponse({
+        'results': [serialize(row, spec, names) for row in page],
+        'next': request.build_absolute_uri(f'?{page.next_query}') if page.has_next() else None,
+        'previous': request.build_absolute_uri(f'?{page.previous_query}') if page.has_previous() else None,
+    })
+
+
+def _post_list(request, posts, *tags):
+    try:
+        names = _requested_fields(request, POST_FIELDS, POST_LIST_DEFAULT)
+    except ValueError as error:
+        return _error(str(error))
+    page = paginate_cursor(request, project(posts, POST_FIELDS, names, POST_ORDERING), PAGE_SIZE)
+    response = _page_response(request, page, POST_FIELDS, names)
+    return tag_response(response, *tags, *(post_tag(row['id']) for row in page))
+
+
+@conditional_page(post_list_validators(lambda: Post.published.all(), PAGE_SIZE))
+@cache_anonymous_page
+def post_list(request):
+    """
+    List published posts, newest first.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        JsonResponse: A page of posts with the links of the next and previous pages.
+    """
+    return _post_list(request, Post.published.all(), POST_LIST_TAG)
+
+
+@conditional_page(post_list_validators(lambda category: Post.published.filter(category__slug=category),
+                                       PAGE_SIZE))
+@cache_anonymous_page
+def category_posts(request, category):
+    """
+    List published posts of a category, newest first.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        category (str): Slug of the category.
+
+    Returns:
+        JsonResponse: A page of posts with the links of the next and previous pages.
+    """
+    return _post_list(request, Post.published.filter(category__slug=category), category_tag(category))
+
+
+@conditional_page(post_list_validators(lambda author: Post.published.filter(author__username=author),
+                                       PAGE_SIZE))
+@cache_anonymous_page
+def author_posts(request, author):
+    """
+    List published posts of an author, newest first.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        author (str): Username of the author.
+
+    Returns:
+        JsonResponse: A page of posts with the links of the next and previous pages.
+    """
+    return _post_list(request, Post.published.filter(author__username=author), author_tag(author))
+
+
+@conditional_page(lambda request, post_id: post_validators(request, Post.published.filter(id=post_id)))
+@cache_anonymous_page
+def post_detail(request, post_id):
+    """
+    Show a published post.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        post_id (int): ID of the post.
+
+    Returns:
+        JsonResponse: The requested fields of the post, or an error.
+    """
+    try:
+        names = _requested_fields(request, POST_FIELDS, POST_DETAIL_DEFAULT)
+    except ValueError as error:
+        return _error(str(error))
+    row = project(Post.published.filter(id=post_id), POST_FIELDS, names).first()
+    if row is None:
+        return _error('Post not found', status=404)
+    return tag_response(JsonResponse(serialize(row, POST_FIELDS, names)), post_tag(post_id))
+
+
+@conditional_page(lambda request, post_id: post_validators(request, Post.published.filter(id=post_id)))
+@cache_anonymous_page
+def post_comments(request, post_id):
+    """
+    List the active comments of a published post, recently updated first.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        post_id (int): ID of the post.
+
+    Returns:
+        JsonResponse: A page of comments with the links of the next and previous pages.
+    """
+    try:
+        names = _requested_fields(request, COMMENT_FIELDS, tuple(COMMENT_FIELDS))
+    except ValueError as error:
+        return _error(str(error))
+    if not Post.published.filter(id=post_id).exists():
+        return _error('Post not found', status=404)
+    comments = Comment.objects.filter(post_id=post_id, active=True)
+    page = paginate_cursor(request, project(comments, COMMENT_FIELDS, names, COMMENT_ORDERING), PAGE_SIZE)
+    return tag_response(_page_response(request, page, COMMENT_FIELDS, names), post_tag(post_id))
+
+
+@conditional_page(navigation_validators)
+@cache_anonymous_page
+def category_list(request):
+    """
+    List all categories by name.
+
+    The table is small and read whole, like the navigation menu.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        JsonResponse: Every category.
+    """
+    try:
+        names = _requested_fields(request, CATEGORY_FIELDS, tuple(CATEGORY_FIELDS))
+    except ValueError as error:
+        return _error(str(error))
+    rows = project(Category.objects.all(), CATEGORY_FIELDS, names)
+    response = JsonResponse({'results': [serialize(row, CATEGORY_FIELDS, names) for row in rows]})
+    return tag_response(response, NAVIGATION_TAG)
+
+
+@conditional_page(navigation_validators)
+@cache_anonymous_page
+def author_list(request):
+    """
+    List the users with at least one post by username.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        JsonResponse: A page of authors with the links of the next and previous pages.
+    """
+    try:
+        names = _requested_fields(request, AUTHOR_FIELDS, tuple(AUTHOR_FIELDS))
+    except ValueError as error:
+        return _error(str(error))
+    authors = User.objects.filter(Exists(Post.objects.filter(author=OuterRef('pk'))))
+    page = paginate_cursor(request, project(authors, AUTHOR_FIELDS, names, ('username',)), PAGE_SIZE,
+                           ordering=('username',))
+    return tag_response(_page_response(request, page, AUTHOR_FIELDS, names), NAVIGATION_TAG)
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.post_list, name='post_list'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/', api.post_comments, name='post_comments'),
+    path('categories/', api.category_list, name='category_list'),
+    path('categories/<slug:category>/posts/', api.category_posts, name='category_posts'),
+    path('authors/', api.author_list, name='author_list'),
+    path('authors/<slug:author>/posts/', api.author_posts, name='author_posts'),
+]
@@ -11,3 +11,9 @@ class BlogConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        """
+        Connect signal receivers of the application.
+        """
+        from . import signals  # noqa: F401
@@ -0,0 +1,152 @@
+import asyncio
+import re
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import render
+
+from . import search
+from .cache import tag_response, post_tag, category_tag, author_tag, POST_LIST_TAG
+from .conditional import conditional_page, post_detail_validators, post_list_validators
+from .decorators import cache_anonymous_page
+from .forms import CommentForm
+from .models import Post, Comment
+from .utils import apaginate_cursor, apaginate_objects, paginate_objects, posts_per_page
+from .views import COMMENTS_PER_PAGE
+
+# Templates may query the database through lazy attributes and context
+# processors, so they are rendered in a worker thread.
+arender = sync_to_async(render)
+
+
+async def _list_page(request, objects, *tags):
+    posts = await apaginate_cursor(request, objects, posts_per_page())
+    response = await arender(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, *tags, *(post_tag(post.id) for post in posts))
+
+
+@conditional_page(post_list_validators(lambda: Post.published.all()))
+@cache_anonymous_page
+async def post_list(request):
+    """
+    Render a list of all published posts.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the list of posts.
+    """
+    return await _list_page(request, Post.published.for_list(), POST_LIST_TAG)
+
+
+@conditional_page(post_list_validators(lambda category: Post.published.filter(category__slug=category)))
+@cache_anonymous_page
+async def post_category(request, category):
+    """
+    Render a list of posts filtered by category.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        category (str): Slug of the category to filter by.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the filtered list of posts.
+    """
+    objects = Post.published.for_list().filter(category__slug=category)
+    return await _list_page(request, objects, category_tag(category))
+
+
+@conditional_page(post_list_validators(lambda author: Post.published.filter(author__username=author)))
+@cache_anonymous_page
+async def post_author(request, author):
+    """
+    Render a list of posts filtered by author.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        author (str): Username of the author to filter by.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the filtered list of posts.
+    """
+    objects = Post.published.for_list().filter(author__username=author)
+    return await _list_page(request, objects, author_tag(author))
+
+
+@conditional_page(post_detail_validators)
+@cache_anonymous_page
+async def post_detail(request, year, month, day, post_slug):
+    """
+    Render details of a specific post.
+
+    The post and its first page of comments are loaded concurrently, the
+    comments select their post with a subquery instead of waiting for its ID.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        year (int): Year of the post's publication.
+        month (int): Month of the post's publication.
+        day (int): Day of the post's publication.
+        post_slug (str): Slug of the post.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the details of the post.
+    """
+    user = await request.auser()
+    posts = Post.published.published_in(year, month, day).filter(slug=post_slug)
+    comments = Comment.objects.filter(post__in=posts.values('id')[:1]) \
+                              .select_related('author') \
+                              .with_reactions(user)
+    post, comments = await asyncio.gather(
+        posts.select_related('author').with_reactions(user).afirst(),
+        apaginate_cursor(request, comments, COMMENTS_PER_PAGE),
+    )
+    if post is None:
+        raise Http404('No Post matches the given query.')
+
+    context = {
+        'post': post,
+        'comments': comments,
+        'form': CommentForm()
+    }
+    response = await arender(request, 'blog/post/detail.html', context)
+    return tag_response(response, post_tag(post.id))
+
+
+async def search_post(request):
+    """
+    Search posts based on user input.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the search results.
+    """
+    search_query = request.GET.get('search_query')
+    search_param = request.GET.get('search_param')
+    posts = Post.published.for_list()
+
+    if search_query:
+        if search_param == 'author':
+            posts = posts.filter(author__username__icontains=search_query)
+        elif search_param == 'title':
+            posts = posts.filter(title__icontains=search_query)
+        elif search_param == 'post':
+            if await sync_to_async(search.fts_available)():
+                # The full-text index is queried with raw SQL, in a worker thread.
+                results = search.FullTextResults(search_query)
+                posts = await sync_to_async(paginate_objects)(request, results, posts_per_page())
+                return await arender(request, 'blog/post/list.html', {'posts': posts})
+            posts = posts.filter(
+                Q(title__icontains=search_query) | Q(body__icontains=search_query)
+            )
+
+        elif search_param == 'publish':
+            parts = re.split(r'\W', search_query)
+            posts = posts.published_in(*parts[:3])
+
+    posts = await apaginate_objects(request, posts, posts_per_page())
+    return await arender(request, 'blog/post/list.html', {'posts': posts})
@@ -0,0 +1,305 @@
+import hashlib
+import time
+from collections import Counter
+from functools import partial, wraps
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.metrics import CACHE_LOOKUPS
+from core.profiling import record_cache
+from core.routers import primary
+
+# Navigation data changes rarely, receivers in blog.signals delete it on writes.
+NAVIGATION_TIMEOUT = 60 * 60 * 24
+NAV_CATEGORIES_KEY = 'blog:nav:categories'
+NAV_AUTHORS_KEY = 'blog:nav:authors'
+NAV_ARCHIVE_KEY = 'blog:nav:archive'
+NAV_VERSION_KEY = 'blog:nav:version'
+
+# Post cards show relative times, so they are kept for a few minutes only.
+POST_CARD_TIMEOUT = 60 * 5
+
+# Sitemaps list posts in chunks of consecutive IDs and are kept until a post
+# changes, which drops the index and only the chunk containing the post.
+SITEMAP_CHUNK_SIZE = 5000
+SITEMAP_INDEX_KEY = 'blog:sitemap:index'
+SITEMAP_CHUNK_KEY = 'blog:sitemap:chunk:{}'
+SITEMAP_PAGES_KEY = 'blog:sitemap:pages'
+
+# Top-N rankings are read from the cache and may lag behind votes for a minute.
+RANKING_TIMEOUT = 60
+RANKING_KEY = 'blog:ranking:{}:{}:{}'
+
+# Anonymous pages are dropped through their tags, the timeout bounds relative times.
+PAGE_TIMEOUT = 60 * 10
+PAGE_KEY = 'blog:page:{}'
+TAG_VERSION_KEY = 'blog:tag:{}'
+TAG_SEQUENCE_KEY = 'blog:tag-sequence'
+NAVIGATION_TAG = 'navigation'
+POST_LIST_TAG = 'post-list'
+
+# Hits and misses of this process, keyed by (namespace, 'hits' | 'misses').
+CACHE_STATS = Counter()
+
+_missing = object()
+
+
+def _count(namespace, hits=0, misses=0):
+    CACHE_STATS[namespace, 'hits'] += hits
+    CACHE_STATS[namespace, 'misses'] += misses
+    record_cache(hits, misses)
+    if hits:
+        CACHE_LOOKUPS.inc(hits, namespace=namespace, result='hit')
+    if misses:
+        CACHE_LOOKUPS.inc(misses, namespace=namespace, result='miss')
+
+
+def get_or_set(key, compute, timeout=None, namespace='default'):
+    """
+    Return the cached value of key, computing and storing it on a miss.
+
+    The value is computed from the primary database, a lagging replica is
+    never cached.
+
+    Args:
+        key (str): Cache key.
+        compute (callable): Function returning the value on a miss.
+        timeout (int): Expiry in seconds, None for the cache default.
+        namespace (str): Label the hit or miss is counted under.
+
+    Returns:
+        The cached or freshly computed value.
+    """
+    value = cache.get(key, _missing)
+    if value is _missing:
+        _count(namespace, misses=1)
+        with primary():
+            value = compute()
+        cache.set(key, value, timeout)
+    else:
+        _count(namespace, hits=1)
+    return value
+
+
+def get_many_or_set(computations, timeout=None, namespace='default'):
+    """
+    Fetch several keys in one round trip, computing and storing the missing ones.
+
+    Args:
+        computations (dict): Mapping of cache key to a function returning its value.
+        timeout (int): Expiry in seconds, None for the cache default.
+        namespace (str): Label the hits and misses are counted under.
+
+    Returns:
+        dict: Mapping of every requested key to its value.
+    """
+    values = cache.get_many(computations.keys())
+    with primary():
+        missing = {key: compute() for key, compute in computations.items() if key not in values}
+    if missing:
+        cache.set_many(missing, timeout)
+        values.update(missing)
+    _count(namespace, hits=len(computations) - len(missing), misses=len(missing))
+    return values
+
+
+def cache_stats():
+    """
+    Summarize the hits and misses counted by this process.
+
+    Returns:
+        dict: Mapping of namespace to its hits, misses and hit rate.
+    """
+    stats = {}
+    for (namespace, kind), count in CACHE_STATS.items():
+        stats.setdefault(namespace, {'hits': 0, 'misses': 0})[kind] = count
+    for counts in stats.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / total if total else 0.0
+    return stats
+
+
+def _after_commit(invalidate):
+    """
+    Decorator delaying an invalidation until the current transaction commits.
+
+    Invalidating earlier would let a concurrent request read the old rows
+    and cache them under the new versions. Outside of a transaction the
+    invalidation runs at once, and it is dropped with a rolled back one.
+    """
+    @wraps(invalidate)
+    def wrapper(*args, **kwargs):
+        transaction.on_commit(partial(invalidate, *args, **kwargs))
+
+    return wrapper
+
+
+def navigation_version():
+    """
+    Return the current navigation version used in fragment cache keys.
+
+    A fresh timestamp is used when the version is missing, so an evicted
+    version never matches fragments rendered before.
+    """
+    return get_or_set(NAV_VERSION_KEY, time.time_ns, None, namespace='navigation')
+
+
+@_after_commit
+def invalidate_navigation(*keys):
+    """
+    Drop cached navigation entries, all of them when no key is given.
+
+    The navigation version is bumped as well, which retires every cached
+    fragment rendered from the dropped entries.
+    """
+    cache.delete_many(keys or (NAV_CATEGORIES_KEY, NAV_AUTHORS_KEY, NAV_ARCHIVE_KEY))
+    cache.set(NAV_VERSION_KEY, time.time_ns(), None)
+    invalidate_tags(NAVIGATION_TAG)
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def category_tag(slug):
+    return f'category:{slug}'
+
+
+def author_tag(username):
+    return f'author:{username}'
+
+
+def sitemap_chunk(post_id):
+    return post_id // SITEMAP_CHUNK_SIZE
+
+
+@_after_commit
+def invalidate_sitemaps(*chunks):
+    """
+    Drop the sitemap index, the category and author sitemap and the given post chunks.
+    """
+    cache.delete_many([SITEMAP_INDEX_KEY, SITEMAP_PAGES_KEY,
+                       *(SITEMAP_CHUNK_KEY.format(chunk) for chunk in chunks)])
+
+
+def _next_tag_version():
+    """
+    Hand out a new tag version from the sequence shared by every process.
+
+    Versions are compared with the sequence read before rendering, a shared
+    counter keeps clock differences between workers out of the comparison.
+    A lost sequence restarts from the current time, above the versions
+    handed out before.
+    """
+    try:
+        return cache.incr(TAG_SEQUENCE_KEY)
+    except ValueError:
+        version = time.time_ns()
+        if cache.add(TAG_SEQUENCE_KEY, version, None):
+            return version
+        # Restarted by another process meanwhile.
+        return cache.incr(TAG_SEQUENCE_KEY)
+
+
+def tag_sequence():
+    """
+    Return the last tag version handed out, read before rendering a page for set_cached_page.
+    """
+    sequence = cache.get(TAG_SEQUENCE_KEY)
+    return _next_tag_version() if sequence is None else sequence
+
+
+@_after_commit
+def invalidate_tags(*tags):
+    """
+    Retire every cached page carrying one of the given tags.
+
+    Each tag has a version stored in the cache. Pages remember the versions
+    they were rendered under, so replacing a version invalidates exactly the
+    pages of that tag without touching any other entry.
+    """
+    version = _next_tag_version()
+    cache.set_many({TAG_VERSION_KEY.format(tag): version for tag in tags}, None)
+
+
+def _tag_versions(tags):
+    keys = {TAG_VERSION_KEY.format(tag): tag for tag in tags}
+    found = cache.get_many(keys.keys())
+    return {tag: found.get(key) for key, tag in keys.items()}
+
+
+def tag_response(response, *tags):
+    """
+    Mark a response as cacheable for anonymous users under the given tags.
+
+    Args:
+        response: The rendered HttpResponse.
+        *tags: Tags whose invalidation must drop the cached page.
+
+    Returns:
+        HttpResponse: The same response.
+    """
+    response.cache_tags = tags
+    return response
+
+
+def page_key(request):
+    """
+    Build the page cache key of a request from its scheme, host, path and query string.
+
+    Feeds contain absolute links, so pages of different hosts are kept apart.
+    """
+    return PAGE_KEY.format(hashlib.md5(request.build_absolute_uri().encode()).hexdigest())
+
+
+def get_cached_page(request):
+    """
+    Return the cached page of request if none of its tags changed since.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        dict: The stored content, content type and tag versions, or None.
+    """
+    entry = cache.get(page_key(request))
+    if entry is not None and _tag_versions(entry['tags']) == entry['tags']:
+        _count('page', hits=1)
+        return entry
+    _count('page', misses=1)
+    return None
+
+
+def set_cached_page(request, response, tags, started):
+    """
+    Store a rendered page under the current versions of its tags.
+
+    Tags without a version yet get a fresh one, so the page stays valid
+    until the next invalidation of any of them. Pages with a tag
+    invalidated since rendering started, i.e. with a version handed out
+    after started, are not stored: they may show rows read before the change.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        response: The rendered HttpResponse.
+        tags (iterable): Tags the page depends on.
+        started (int): tag_sequence() from before rendering.
+
+    Returns:
+        bool: Whether the page was stored.
+    """
+    versions = _tag_versions(set(tags) | {NAVIGATION_TAG})
+    if any(version is not None and version > started for version in versions.values()):
+        return False
+    missing = [tag for tag, version in versions.items() if version is None]
+    if missing:
+        version = _next_tag_version()
+        cache.set_many({TAG_VERSION_KEY.format(tag): version for tag in missing}, None)
+        versions.update(_tag_versions(missing))
+    cache.set(page_key(request), {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'tags': versions,
+    }, PAGE_TIMEOUT)
+    return True
@@ -0,0 +1,163 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.views.decorators.http import condition
+
+from .cache import navigation_version
+from .models import Post, PostVote, Comment, CommentVote
+from .utils import paginate_cursor, posts_per_page
+
+# Columns of a list page that change what its cards render.
+LIST_VALIDATOR_FIELDS = ('id', 'publish', 'created', 'updated', 'likes_count', 'dislikes_count', 'comments_count')
+
+
+def _latest(queryset):
+    return Subquery(queryset.order_by('-updated').values('updated')[:1])
+
+
+def _make_etag(request, *parts):
+    """
+    Hash the parts together with everything else the rendered page depends on.
+
+    The navigation version covers the header and sidebar, the user ID the
+    reaction state and menu of the viewer.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else None
+    payload = repr((request.get_full_path(), user_id, navigation_version()) + parts)
+    return 'W/"{}"'.format(hashlib.md5(payload.encode()).hexdigest())
+
+
+def _memoized(compute):
+    """
+    Compute the (etag, last_modified) pair once per request.
+
+    condition() calls the ETag and Last-Modified functions separately, both
+    are answered from the same query. Requests with pending flash messages
+    get no validators, the messages must be rendered in a fresh page.
+    """
+    @wraps(compute)
+    def wrapper(request, *args, **kwargs):
+        if not hasattr(request, '_blog_validators'):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                request._blog_validators = (None, None)
+            else:
+                request._blog_validators = compute(request, *args, **kwargs)
+        return request._blog_validators
+
+    return wrapper
+
+
+def conditional_page(validators):
+    """
+    Decorator answering matching conditional GET requests with 304.
+
+    Works for synchronous and asynchronous views.
+
+    Args:
+        validators: Function taking the view arguments and returning the
+            (etag, last_modified) pair of the page, or (None, None).
+
+    Returns:
+        function: Decorator for a view function.
+    """
+    validators = _memoized(validators)
+    decorator = condition(etag_func=lambda *args, **kwargs: validators(*args, **kwargs)[0],
+                          last_modified_func=lambda *args, **kwargs: validators(*args, **kwargs)[1])
+
+    def decorate(view_func):
+        view = decorator(view_func)
+        if not iscoroutinefunction(view_func):
+            return view
+
+        @wraps(view_func)
+        async def async_view(request, *args, **kwargs):
+            # condition() calls the validators synchronously; they query the
+            # database, so they are computed and memoized in a thread first.
+            await sync_to_async(validators)(request, *args, **kwargs)
+            return await view(request, *args, **kwargs)
+
+        return async_view
+
+    return decorate
+
+
+def navigation_validators(request, *args, **kwargs):
+    """
+    Build the validators of a page showing navigation data only.
+
+    Categories and authors are covered by the navigation version, no query is run.
+
+    Returns:
+        tuple: ETag and no Last-Modified.
+    """
+    return _make_etag(request), None
+
+
+def post_validators(request, posts):
+    """
+    Build the validators of a page showing a single post in a single query.
+
+    The ETag covers the newest timestamps of the post, its comments and their
+    votes, and the stored counters. No Last-Modified is sent: counters updated
+    in place and removed votes leave no timestamp behind, a client comparing
+    dates only would keep a stale page.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        posts (QuerySet): Published posts filtered down to the shown post.
+
+    Returns:
+        tuple: ETag and no Last-Modified, (None, None) if the post does not exist.
+    """
+    comments = Comment.objects.filter(post=OuterRef('pk'))
+    row = posts \
+        .values('id', 'updated', 'likes_count', 'dislikes_count', 'comments_count') \
+        .annotate(last_comment=_latest(comments),
+                  last_post_vote=_latest(PostVote.objects.filter(post=OuterRef('pk'))),
+                  last_comment_vote=_latest(CommentVote.objects.filter(comment__post=OuterRef('pk'))),
+                  comment_votes=Subquery(comments.order_by()
+                                         .values('post')
+                                         .annotate(total=Sum(F('likes_count') + F('dislikes_count')))
+                                         .values('total'))) \
+        .first()
+    if row is None:
+        return None, None
+    return _make_etag(request, *row.values()), None
+
+
+def post_detail_validators(request, year, month, day, post_slug):
+    """
+    Build the validators of a post page, see post_validators.
+    """
+    return post_validators(request, Post.published.published_in(year, month, day).filter(slug=post_slug))
+
+
+def post_list_validators(filter_posts, num_per_page=None):
+    """
+    Build a validators function for a cursor paginated post list.
+
+    The page is fetched with the same cursor as the view, but only the
+    columns that change its cards are read. Like post_validators, only an
+    ETag is built.
+
+    Args:
+        filter_posts: Function taking the view keyword arguments and
+            returning the published posts the view lists.
+        num_per_page (int): Page size of the view, BLOG_POSTS_PER_PAGE if omitted.
+
+    Returns:
+        function: Validators function for conditional_page.
+    """
+    def validators(request, *args, **kwargs):
+        rows = paginate_cursor(request, filter_posts(**kwargs).values(*LIST_VALIDATOR_FIELDS),
+                               num_per_page or posts_per_page())
+        if not rows:
+            return _make_etag(request), None
+
+        parts = tuple(tuple(row.values()) for row in rows)
+        return _make_etag(request, rows.has_next(), *parts), None
+
+    return validators
@@ -1,11 +1,73 @@
-from .models import Category, User
-from django.db.models import Count
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import TruncMonth
+from django.utils.functional import SimpleLazyObject
+
+from .cache import (
+    get_or_set,
+    navigation_version,
+    NAVIGATION_TIMEOUT,
+    NAV_CATEGORIES_KEY,
+    NAV_AUTHORS_KEY,
+    NAV_ARCHIVE_KEY
+)
+from .models import Category, Post, User
+
+
+def navigation_categories():
+    """
+    Return the cached list of categories shown in the navigation.
+
+    Returns:
+        list: Dictionaries with the name and slug of every category.
+    """
+    return get_or_set(NAV_CATEGORIES_KEY,
+                      lambda: list(Category.objects.values('name', 'slug')),
+                      NAVIGATION_TIMEOUT,
+                      namespace='navigation')
+
+
+def navigation_authors():
+    """
+    Return the cached list of authors shown in the navigation.
+
+    Returns:
+        list: Dictionaries with the username of every user who has at least one post.
+    """
+    has_posts = Exists(Post.objects.filter(author=OuterRef('pk')))
+    return get_or_set(NAV_AUTHORS_KEY,
+                      lambda: list(User.objects.filter(has_posts).order_by('username').values('username')),
+                      NAVIGATION_TIMEOUT,
+                      namespace='navigation')
+
+
+def navigation_archive():
+    """
+    Return the cached month-by-month counts of published posts.
+
+    The GROUP BY runs once after every post change instead of on every
+    sidebar render, months are computed in the current time zone.
+
+    Returns:
+        list: Dictionaries with the first day of a month and its post count,
+        newest month first.
+    """
+    return get_or_set(NAV_ARCHIVE_KEY,
+                      lambda: list(Post.published
+                                   .annotate(month=TruncMonth('publish'))
+                                   .order_by('-month')
+                                   .values('month')
+                                   .annotate(count=Count('id'))),
+                      NAVIGATION_TIMEOUT,
+                      namespace='navigation')
 
 
 def get_categories(request):
     """
     Retrieve all categories from the database.
 
+    The list is served from the cache and only fetched when a template
+    actually reads it.
+
     Args:
         request: HttpRequest object representing the current request.
 
@@ -13,19 +75,46 @@ def get_categories(request):
         dict: A dictionary containing all categories retrieved from the database.
 
     """
-    categories = Category.objects.all()
-    return {'categories': categories}
+    return {'categories': SimpleLazyObject(navigation_categories)}
 
 
 def get_author(request):
     """
     Retrieve all authors who have at least one post from the database.
 
+    The list is served from the cache and only fetched when a template
+    actually reads it.
+
     Args:
         request: HttpRequest object representing the current request.
 
     Returns:
         dict: A dictionary containing all authors with at least one post retrieved from the database.
     """
-    authors = User.objects.annotate(num_posts=Count('posts')).filter(num_posts__gt=0)
-    return {'authors': authors}
+    return {'authors': SimpleLazyObject(navigation_authors)}
+
+
+def get_navigation_version(request):
+    """
+    Provide the navigation version the header and sidebar fragments are cached under.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        dict: A dictionary containing the lazily read navigation version.
+    """
+    return {'nav_version': SimpleLazyObject(navigation_version)}
+
+
+def get_archive_months(request):
+    """
+    Provide the month archive shown in the sidebar.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        dict: A dictionary containing the lazily read month counts.
+    """
+    return {'archive_months': SimpleLazyObject(navigation_archive)}
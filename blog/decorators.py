@@ -0,0 +1,93 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.messages import get_messages
+from django.http import HttpResponse
+
+from core.routers import primary
+
+from .cache import get_cached_page, set_cached_page, tag_sequence
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Pending flash messages are rendered into the page.
+    return not len(get_messages(request))
+
+
+def _is_cacheable_response(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    # A CSRF token rendered into the page would be shared by every visitor.
+    return not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+
+
+def _lookup(request):
+    """
+    Return whether the request may use the page cache, its cached response if
+    any, and otherwise the tag sequence to render the page under.
+    """
+    if not _is_cacheable_request(request):
+        return False, None, None
+    entry = get_cached_page(request)
+    if entry is None:
+        return True, None, tag_sequence()
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'hit'
+    return True, response, None
+
+
+def _store(request, response, started):
+    tags = getattr(response, 'cache_tags', None)
+    if tags is not None and _is_cacheable_response(request, response):
+        set_cached_page(request, response, tags, started)
+        response['X-Page-Cache'] = 'miss'
+    return response
+
+
+def cache_anonymous_page(view_func):
+    """
+    Decorator serving anonymous GET requests from the tagged page cache.
+
+    Only responses tagged with blog.cache.tag_response are stored. Logged in
+    users, requests with pending messages and pages that rendered a CSRF
+    token or set a cookie always bypass the cache. Pages rendered for the
+    cache read from the primary database, so a lagging replica is not kept
+    until the next invalidation. Asynchronous views are supported, the
+    session and cache lookups then run in a worker thread.
+
+    Args:
+        view_func: The view function to decorate.
+
+    Returns:
+        function: The decorated view function.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            cacheable, cached, started = await sync_to_async(_lookup)(request)
+            if cached is not None:
+                return cached
+            if not cacheable:
+                return await view_func(request, *args, **kwargs)
+            with primary():
+                response = await view_func(request, *args, **kwargs)
+            return await sync_to_async(_store)(request, response, started)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        cacheable, cached, started = _lookup(request)
+        if cached is not None:
+            return cached
+        if not cacheable:
+            return view_func(request, *args, **kwargs)
+        with primary():
+            response = view_func(request, *args, **kwargs)
+        return _store(request, response, started)
+
+    return wrapper
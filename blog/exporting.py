@@ -0,0 +1,156 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Post, PostVote, Comment, CommentVote
+from .utils import date_range
+
+FORMATS = ('jsonl', 'csv')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Lines handed from the worker thread to the event loop at once by aiterate.
+ASYNC_BATCH_SIZE = 500
+
+# Exportable tables: queryset, exported columns, the date the range filter
+# applies to and the path from a row to its post, used by the category and
+# author filters.
+EXPORTS = {
+    'posts': {
+        'queryset': Post.objects.all(),
+        'fields': ('id', 'title', 'slug', 'status', 'publish', 'created', 'updated', 'image_url',
+                   'author__username', 'category__slug', 'likes_count', 'dislikes_count',
+                   'comments_count', 'body'),
+        'date_field': 'publish',
+        'post_path': '',
+    },
+    'comments': {
+        'queryset': Comment.objects.all(),
+        'fields': ('id', 'post_id', 'author__username', 'active', 'created', 'updated',
+                   'likes_count', 'dislikes_count', 'body'),
+        'date_field': 'created',
+        'post_path': 'post__',
+    },
+    'post-votes': {
+        'queryset': PostVote.objects.all(),
+        'fields': ('id', 'post_id', 'user__username', 'value', 'created', 'updated'),
+        'date_field': 'created',
+        'post_path': 'post__',
+    },
+    'comment-votes': {
+        'queryset': CommentVote.objects.all(),
+        'fields': ('id', 'comment_id', 'comment__post_id', 'user__username', 'value', 'created', 'updated'),
+        'date_field': 'created',
+        'post_path': 'comment__post__',
+    },
+}
+
+
+def _parse_day(value, name):
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'{name} must be a date in the YYYY-MM-DD format')
+    return day
+
+
+def export_rows(kind, since=None, until=None, category=None, author=None, chunk_size=2000):
+    """
+    Stream the rows of an exportable table as dictionaries.
+
+    Rows are read with values() in primary key order and fetched in chunks,
+    no model instance is created and memory does not grow with the table.
+
+    Args:
+        kind (str): Key of EXPORTS.
+        since (str): First day to export, YYYY-MM-DD, inclusive.
+        until (str): Last day to export, YYYY-MM-DD, inclusive.
+        category (str): Only rows of posts in the category with this slug.
+        author (str): Only rows of posts written by the user with this username.
+        chunk_size (int): Rows fetched from the database at once.
+
+    Returns:
+        tuple: Exported field names and an iterator of row dictionaries.
+
+    Raises:
+        ValueError: If the table or a filter value is invalid.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f'Unknown export {kind!r}, choose one of {", ".join(EXPORTS)}')
+    spec = EXPORTS[kind]
+    queryset = spec['queryset']
+    date_field, post_path = spec['date_field'], spec['post_path']
+
+    if since:
+        day = _parse_day(since, 'since')
+        queryset = queryset.filter(**{f'{date_field}__gte': date_range(day.year, day.month, day.day)[0]})
+    if until:
+        day = _parse_day(until, 'until')
+        queryset = queryset.filter(**{f'{date_field}__lt': date_range(day.year, day.month, day.day)[1]})
+    if category:
+        queryset = queryset.filter(**{f'{post_path}category__slug': category})
+    if author:
+        queryset = queryset.filter(**{f'{post_path}author__username': author})
+
+    rows = queryset.order_by('pk').values(*spec['fields']).iterator(chunk_size=chunk_size)
+    return spec['fields'], rows
+
+
+class _Echo:
+    """
+    File-like object returning what is written, lets csv.writer produce lines lazily.
+    """
+
+    def write(self, value):
+        return value
+
+
+def serialize(fields, rows, fmt):
+    """
+    Turn row dictionaries into lines of JSONL or CSV text, one at a time.
+
+    Args:
+        fields (tuple): Field names, used as the CSV header.
+        rows: Iterator of row dictionaries.
+        fmt (str): 'jsonl' or 'csv'.
+
+    Yields:
+        str: Lines including their line break.
+    """
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
+        return
+
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+async def aiterate(lines, batch_size=ASYNC_BATCH_SIZE):
+    """
+    Iterate lines produced by serialize from asynchronous code.
+
+    Under ASGI, Django reads a synchronous streaming iterator whole before
+    sending it. Here the rows are still read by the synchronous ORM in a
+    worker thread, but one batch of lines at a time, so memory holds at
+    most one batch.
+
+    Args:
+        lines: Iterator of lines, e.g. from serialize.
+        batch_size (int): Lines read per hop to the worker thread.
+
+    Yields:
+        str: Consecutive lines joined together.
+    """
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, batch_size)))
+    while batch := await next_batch():
+        yield batch
@@ -0,0 +1,160 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .cache import tag_response, category_tag, author_tag, POST_LIST_TAG
+from .conditional import conditional_page, post_list_validators
+from .decorators import cache_anonymous_page
+from .models import Category, Post, User
+
+FEED_SIZE = 20
+
+
+class LatestPostsFeed(Feed):
+    """
+    RSS feed of the latest published posts.
+    """
+    title = 'Blog'
+    description = 'Latest posts'
+
+    def link(self, obj=None):
+        return reverse('blog:post_list')
+
+    def posts(self, obj):
+        """
+        Return the published posts listed by the feed of obj.
+        """
+        return Post.published.all()
+
+    def items(self, obj=None):
+        return self.posts(obj).for_list()[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return Truncator(item.excerpt).words(50)
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.publish
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_categories(self, item):
+        return [item.category.name]
+
+
+class CategoryPostsFeed(LatestPostsFeed):
+    """
+    RSS feed of the latest published posts of a category.
+    """
+
+    def get_object(self, request, category):
+        return get_object_or_404(Category, slug=category)
+
+    def title(self, obj):
+        return f'Blog: {obj.name}'
+
+    def description(self, obj):
+        return f'Latest posts in {obj.name}'
+
+    def link(self, obj):
+        return reverse('blog:post_category', args=[obj.slug])
+
+    def posts(self, obj):
+        return Post.published.filter(category=obj)
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    """
+    RSS feed of the latest published posts of an author.
+    """
+
+    def get_object(self, request, author):
+        return get_object_or_404(User.objects.only('id', 'username'), username=author)
+
+    def title(self, obj):
+        return f'Blog: posts by {obj.username}'
+
+    def description(self, obj):
+        return f'Latest posts by {obj.username}'
+
+    def link(self, obj):
+        return reverse('blog:post_author', args=[obj.username])
+
+    def posts(self, obj):
+        return Post.published.filter(author=obj)
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """
+    Atom feed of the latest published posts.
+    """
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryPostsAtomFeed(CategoryPostsFeed):
+    """
+    Atom feed of the latest published posts of a category.
+    """
+    feed_type = Atom1Feed
+    subtitle = CategoryPostsFeed.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    """
+    Atom feed of the latest published posts of an author.
+    """
+    feed_type = Atom1Feed
+    subtitle = AuthorPostsFeed.description
+
+
+def cached_feed(feed_class, filter_posts, tags):
+    """
+    Build a feed view served from the page cache and answering conditional GETs.
+
+    Args:
+        feed_class: Feed subclass rendering the feed.
+        filter_posts: Function taking the URL keyword arguments and returning
+            the published posts of the feed, used by the validators.
+        tags: Function taking the URL keyword arguments and returning the
+            page cache tags of the feed.
+
+    Returns:
+        function: The feed view.
+    """
+    feed = feed_class()
+
+    @conditional_page(post_list_validators(filter_posts, FEED_SIZE))
+    @cache_anonymous_page
+    def view(request, **kwargs):
+        return tag_response(feed(request, **kwargs), *tags(**kwargs))
+
+    return view
+
+
+def _all_posts():
+    return Post.published.all()
+
+
+def _category_posts(category):
+    return Post.published.filter(category__slug=category)
+
+
+def _author_posts(author):
+    return Post.published.filter(author__username=author)
+
+
+posts_rss = cached_feed(LatestPostsFeed, _all_posts, lambda: (POST_LIST_TAG,))
+posts_atom = cached_feed(LatestPostsAtomFeed, _all_posts, lambda: (POST_LIST_TAG,))
+category_rss = cached_feed(CategoryPostsFeed, _category_posts, lambda category: (category_tag(category),))
+category_atom = cached_feed(CategoryPostsAtomFeed, _category_posts, lambda category: (category_tag(category),))
+author_rss = cached_feed(AuthorPostsFeed, _author_posts, lambda author: (author_tag(author),))
+author_atom = cached_feed(AuthorPostsAtomFeed, _author_posts, lambda author: (author_tag(author),))
@@ -0,0 +1,342 @@
+import csv
+import json
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from . import rankings, search
+from .cache import (
+    invalidate_navigation,
+    invalidate_sitemaps,
+    invalidate_tags,
+    category_tag,
+    author_tag,
+    sitemap_chunk,
+    POST_LIST_TAG
+)
+from .models import Category, Post
+from .utils import date_range
+
+User = get_user_model()
+
+FORMATS = ('jsonl', 'csv')
+
+# Numbered slug variants are looked up with one condition per colliding slug
+# and day, SQLite limits how deeply the OR-ed conditions may nest.
+SLUG_RANGES_PER_QUERY = 100
+
+
+class RecordError(ValueError):
+    """
+    Raised for a record that can not be imported; the record is skipped.
+    """
+
+
+def read_records(stream, fmt):
+    """
+    Yield (line number, record) pairs from a JSONL or CSV stream one at a time.
+
+    Args:
+        stream: Open text file.
+        fmt (str): 'jsonl' or 'csv', CSV files need a header row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield line_number, RecordError(f'invalid JSON: {error}')
+            continue
+        if not isinstance(record, dict):
+            record = RecordError('a JSON object is expected')
+        yield line_number, record
+
+
+def _required(record, field):
+    value = str(record.get(field) or '').strip()
+    if not value:
+        raise RecordError(f'{field} is required')
+    return value
+
+
+class Importer(ABC):
+    """
+    Base class writing records in batches, one transaction per batch.
+
+    Subclasses turn a record into an unsaved instance with build() and may
+    extend write() with work done for every saved batch.
+    """
+    model = None
+
+    def __init__(self, batch_size=1000, stderr=None):
+        self.batch_size = batch_size
+        self.stderr = stderr
+        self.created = 0
+        self.skipped = 0
+
+    @abstractmethod
+    def build(self, record):
+        """
+        Return the unsaved instance of a record, None to skip it silently.
+
+        Raises:
+            RecordError: If the record can not be imported.
+        """
+
+    def write(self, instances):
+        self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+    def finish(self):
+        """
+        Hook called once after the last batch.
+        """
+
+    def _skip(self, line_number, error):
+        self.skipped += 1
+        if self.stderr is not None:
+            self.stderr.write(f'line {line_number}: {error}')
+
+    def _instances(self, records):
+        for line_number, record in records:
+            if isinstance(record, Exception):
+                self._skip(line_number, record)
+                continue
+            try:
+                instance = self.build(record)
+            except (ValueError, TypeError) as error:
+                self._skip(line_number, error)
+                continue
+            if instance is not None:
+                yield instance
+
+    def run(self, records, progress=None):
+        """
+        Import every record of the iterable.
+
+        Memory use is bounded by the batch size and the lookup maps, not by
+        the number of records.
+
+        Args:
+            records: Iterable of (line number, record) pairs from read_records.
+            progress (callable): Called after every batch with the importer
+                and the elapsed seconds.
+        """
+        started = time.monotonic()
+        instances = self._instances(records)
+        while batch := list(islice(instances, self.batch_size)):
+            with transaction.atomic():
+                self.write(batch)
+            self.created += len(batch)
+            if progress is not None:
+                progress(self, time.monotonic() - started)
+        self.finish()
+        return time.monotonic() - started
+
+
+class CategoryImporter(Importer):
+    """
+    Import categories from records with a name and an optional slug.
+    """
+    model = Category
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.names = set()
+        self.slugs = set()
+        for name, slug in Category.objects.values_list('name', 'slug').iterator():
+            self.names.add(name)
+            self.slugs.add(slug)
+
+    def build(self, record):
+        name = _required(record, 'name')
+        slug = str(record.get('slug') or '').strip() or slugify(name)
+        if not slug:
+            raise RecordError(f'no slug can be made from {name!r}')
+        if name in self.names or slug in self.slugs:
+            raise RecordError(f'category {name!r} already exists')
+        self.names.add(name)
+        self.slugs.add(slug)
+        return Category(name=name, slug=slug)
+
+    def finish(self):
+        if self.created:
+            invalidate_navigation()
+
+
+class UserImporter(Importer):
+    """
+    Import users from records with email, username, first_name and last_name.
+
+    Passwords are never imported, users get an unusable password and set
+    their own through password reset. No hashing keeps the import fast.
+    """
+    model = User
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.usernames = set()
+        self.emails = set()
+        for username, email in User.objects.values_list('username', 'email').iterator():
+            self.usernames.add(username)
+            self.emails.add(email.lower())
+
+    def build(self, record):
+        email = User.objects.normalize_email(_required(record, 'email'))
+        username = _required(record, 'username')
+        if username in self.usernames or email.lower() in self.emails:
+            raise RecordError(f'user {username!r} or {email!r} already exists')
+        user = User(email=email,
+                    username=username,
+                    first_name=_required(record, 'first_name'),
+                    last_name=_required(record, 'last_name'))
+        user.set_unusable_password()
+        self.usernames.add(username)
+        self.emails.add(email.lower())
+        return user
+
+
+class PostImporter(Importer):
+    """
+    Import posts from records with title, body, author and category.
+
+    Authors are matched by username and categories by slug or name through
+    maps loaded once. Slugs come from the title unless given and get a
+    numeric suffix when the slug is already used on the same publish date.
+    """
+    model = Post
+
+    def __init__(self, *args, create_categories=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.create_categories = create_categories
+        self.authors = dict(User.objects.values_list('username', 'id').iterator())
+        self.categories = {}
+        for category_id, name, slug in Category.objects.values_list('id', 'name', 'slug').iterator():
+            self.categories[slug] = self.categories[name] = (category_id, slug)
+        self.touched_categories = set()
+        self.touched_authors = set()
+        self.touched_chunks = set()
+
+    def _category(self, value):
+        if value not in self.categories:
+            if not self.create_categories:
+                raise RecordError(f'unknown category {value!r}')
+            slug = slugify(value)
+            category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': value})
+            self.categories[value] = self.categories[slug] = (category.id, slug)
+        return self.categories[value]
+
+    def build(self, record):
+        username = _required(record, 'author')
+        if username not in self.authors:
+            raise RecordError(f'unknown author {username!r}')
+        category_id, category_slug = self._category(_required(record, 'category'))
+
+        publish = timezone.now()
+        if record.get('publish'):
+            publish = parse_datetime(record['publish'])
+            if publish is None:
+                raise RecordError(f'invalid publish date {record["publish"]!r}')
+            if timezone.is_naive(publish):
+                publish = timezone.make_aware(publish)
+
+        status = record.get('status') or 'published'
+        if status not in dict(Post.STATUS_CHOICES):
+            raise RecordError(f'invalid status {status!r}')
+
+        title = _required(record, 'title')
+        slug = slugify(record.get('slug') or title)[:Post._meta.get_field('slug').max_length]
+        if not slug:
+            raise RecordError(f'no slug can be made from {title!r}')
+
+        self.touched_categories.add(category_slug)
+        self.touched_authors.add(username)
+        return Post(title=title,
+                    slug=slug,
+                    body=_required(record, 'body'),
+                    author=User(pk=self.authors[username], username=username),
+                    category_id=category_id,
+                    publish=publish,
+                    status=status,
+                    image_url=record.get('image_url') or '')
+
+    @staticmethod
+    def _taken_slugs(query, tz):
+        """
+        Return the (slug, local publish date) pairs of the stored posts matching query.
+        """
+        return {(slug, publish.astimezone(tz).date())
+                for slug, publish in Post.objects.filter(query).values_list('slug', 'publish').iterator()}
+
+    def _assign_slugs(self, posts):
+        """
+        Make the slugs of a batch unique for their publish date.
+
+        One query finds the stored slugs equal to the candidates, a second
+        one loads the numbered variants published on the same day as a
+        colliding slug, whether it collides in the database or within the batch.
+        """
+        tz = timezone.get_current_timezone()
+        taken = self._taken_slugs(Q(slug__in={post.slug for post in posts}), tz)
+        seen = set()
+        colliding = set()
+        for post in posts:
+            key = (post.slug, post.publish.astimezone(tz).date())
+            if key in taken or key in seen:
+                colliding.add(key)
+            seen.add(key)
+
+        colliding = sorted(colliding)
+        for start in range(0, len(colliding), SLUG_RANGES_PER_QUERY):
+            query = Q()
+            for base, day in colliding[start:start + SLUG_RANGES_PER_QUERY]:
+                day_start, day_end = date_range(day.year, day.month, day.day)
+                query |= Q(slug__gt=f'{base}-', slug__lt=f'{base}.', publish__gte=day_start, publish__lt=day_end)
+            taken |= self._taken_slugs(query, tz)
+
+        max_length = Post._meta.get_field('slug').max_length
+        for post in posts:
+            base, day = post.slug, post.publish.astimezone(tz).date()
+            suffix = 1
+            while (post.slug, day) in taken:
+                suffix += 1
+                ending = f'-{suffix}'
+                post.slug = base[:max_length - len(ending)] + ending
+            taken.add((post.slug, day))
+
+    def write(self, posts):
+        self._assign_slugs(posts)
+        super().write(posts)
+        # bulk_create sends no signals, keep the derived tables in sync here.
+        search.index_posts(posts)
+        rankings.rank_new_posts(posts, self.batch_size)
+        self.touched_chunks.update(sitemap_chunk(post.pk) for post in posts)
+
+    def finish(self):
+        if not self.created:
+            return
+        invalidate_navigation()
+        invalidate_tags(POST_LIST_TAG,
+                        *(category_tag(slug) for slug in self.touched_categories),
+                        *(author_tag(username) for username in self.touched_authors))
+        invalidate_sitemaps(*self.touched_chunks)
+
+
+IMPORTERS = {
+    'post': PostImporter,
+    'category': CategoryImporter,
+    'user': UserImporter,
+}
@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import Profile
+from blog.models import Post, User
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the read views under WSGI and ASGI.
+
+    Each mode runs in its own process, ASGI with BLOG_ASYNC_VIEWS=1, and
+    calls the Django handler directly: WSGI requests come from a pool of
+    threads like a threaded server, ASGI requests are concurrent tasks on
+    one event loop. No server or socket is involved, so the numbers compare
+    the request handling of the two stacks only.
+    """
+    help = 'Compare requests per second of the read views under WSGI and ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64],
+                            help='Concurrent requests, one run per level.')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per mode and level.')
+        parser.add_argument('--user', help='Send requests as this username, which bypasses the page cache.')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS.')
+        parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            results = self._run_worker(options)
+            self.stdout.write(json.dumps(results))
+            return
+
+        results = {mode: self._spawn(mode, options) for mode in MODES}
+        self.stdout.write(f'{"concurrency":>11}  {"WSGI req/s":>10}  {"ASGI req/s":>10}  {"errors":>6}')
+        for level in options['concurrency']:
+            wsgi, asgi = results['wsgi'][str(level)], results['asgi'][str(level)]
+            errors = wsgi['errors'] + asgi['errors']
+            self.stdout.write(f'{level:>11}  {wsgi["rps"]:>10.1f}  {asgi["rps"]:>10.1f}  {errors:>6}')
+
+    def _spawn(self, mode, options):
+        command = [sys.executable, '-m', 'django', 'bench_views', '--worker', mode,
+                   '--requests', str(options['requests']), '--host', options['host'],
+                   '--concurrency', *map(str, options['concurrency'])]
+        if options['user']:
+            command += ['--user', options['user']]
+        env = dict(os.environ,
+                   BLOG_ASYNC_VIEWS='1' if mode == 'asgi' else '0',
+                   DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+                   PYTHONPATH=os.pathsep.join([str(settings.BASE_DIR), *sys.path]))
+        self.stderr.write(f'Running {mode.upper()}...')
+        process = subprocess.run(command, env=env, capture_output=True, text=True)
+        if process.returncode:
+            raise CommandError(f'The {mode} run failed:\n{process.stderr}')
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def _urls(self):
+        post = Post.published.select_related('author', 'category').first()
+        profile = Profile.objects.select_related('user').first()
+        if post is None or profile is None:
+            raise CommandError('At least one published post and one profile are needed.')
+        return [
+            reverse('blog:post_list'),
+            reverse('blog:post_category', args=[post.category.slug]),
+            reverse('blog:post_author', args=[post.author.username]),
+            post.get_absolute_url(),
+            reverse('blog:search_posts') + f'?search_param=title&search_query={post.title.split()[0]}',
+            reverse('accounts:profile_detail', args=[profile.user.username]),
+        ]
+
+    def _cookie(self, username):
+        if not username:
+            return ''
+        client = Client()
+        client.force_login(User.objects.get(username=username))
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+
+    def _run_worker(self, options):
+        urls = self._urls()
+        cookie = self._cookie(options['user'])
+        if options['worker'] == 'wsgi':
+            run = _WsgiRunner(options['host'], cookie).run
+        else:
+            run = _AsgiRunner(options['host'], cookie).run
+
+        run(urls, 1, len(urls))  # Warm up caches and connections.
+        results = {}
+        for level in options['concurrency']:
+            started = time.perf_counter()
+            statuses = run(urls, level, options['requests'])
+            elapsed = time.perf_counter() - started
+            results[level] = {
+                'rps': len(statuses) / elapsed,
+                'errors': sum(status != 200 for status in statuses),
+            }
+        return results
+
+
+class _WsgiRunner:
+    """
+    Call the WSGI handler from a pool of threads, like a threaded WSGI server.
+    """
+
+    def __init__(self, host, cookie):
+        self.handler = WSGIHandler()
+        self.host = host
+        self.cookie = cookie
+
+    def request(self, url):
+        path, _, query = url.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': self.host,
+            'HTTP_COOKIE': self.cookie,
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+        }
+        statuses = []
+        response = self.handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        for _ in response:
+            pass
+        response.close()
+        return int(statuses[0].split()[0])
+
+    def run(self, urls, concurrency, count):
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(self.request, islice(cycle(urls), count)))
+
+
+class _AsgiRunner:
+    """
+    Call the ASGI handler from concurrent tasks on one event loop, like an ASGI server.
+    """
+
+    def __init__(self, host, cookie):
+        self.handler = ASGIHandler()
+        self.host = host
+        self.cookie = cookie
+
+    async def request(self, url):
+        path, _, query = url.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', self.host.encode()), (b'cookie', self.cookie.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+        }
+        body_sent = False
+        statuses = []
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects, the handler cancels this wait.
+            await asyncio.Future()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await self.handler(scope, receive, send)
+        return statuses[0]
+
+    def run(self, urls, concurrency, count):
+        async def run_all():
+            pending = islice(cycle(urls), count)
+            statuses = []
+
+            async def client():
+                for url in pending:
+                    statuses.append(await self.request(url))
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+            return statuses
+
+        return asyncio.run(run_all())
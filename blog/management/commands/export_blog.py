@@ -0,0 +1,50 @@
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.exporting import EXPORTS, FORMATS, export_rows, serialize
+
+
+class Command(BaseCommand):
+    """
+    Stream posts, comments or votes as JSONL or CSV.
+    """
+    help = 'Export a blog table as JSONL or CSV, optionally filtered by date, category and author.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS), help='Table to export.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', default='-', help='File to write, "-" writes to standard output.')
+        parser.add_argument('--since', help='First day to export, YYYY-MM-DD.')
+        parser.add_argument('--until', help='Last day to export, YYYY-MM-DD.')
+        parser.add_argument('--category', help='Slug of the category of the exported posts.')
+        parser.add_argument('--author', help='Username of the author of the exported posts.')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Rows fetched from the database at once.')
+
+    def handle(self, *args, **options):
+        try:
+            fields, rows = export_rows(options['kind'],
+                                       since=options['since'],
+                                       until=options['until'],
+                                       category=options['category'],
+                                       author=options['author'],
+                                       chunk_size=options['chunk_size'])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        to_stdout = options['output'] == '-'
+        output = self.stdout if to_stdout else open(options['output'], 'w', encoding='utf-8', newline='')
+        # OutputWrapper appends a newline to lines that lack one, lines are written as serialized.
+        write = partial(output.write, ending='') if to_stdout else output.write
+        total = 0
+        try:
+            for line in serialize(fields, rows, options['format']):
+                write(line)
+                total += 1
+        finally:
+            if not to_stdout:
+                output.close()
+        if options['format'] == 'csv':
+            total -= 1
+        self.stderr.write(self.style.SUCCESS(f'Exported {total} {options["kind"]} rows'))
@@ -0,0 +1,60 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.importing import FORMATS, IMPORTERS, read_records
+
+# Seconds between two progress lines.
+PROGRESS_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    """
+    Stream posts, categories or users from a JSONL or CSV file into the database.
+
+    Import categories and users first, posts refer to them by slug or name
+    and by username. Invalid records are reported and skipped.
+    """
+    help = 'Bulk import posts, categories or users from a JSONL or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, "-" reads standard input.')
+        parser.add_argument('--model', choices=sorted(IMPORTERS), default='post',
+                            help='Kind of records in the file (default: post).')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Input format, guessed from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Records written per bulk insert and transaction.')
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Create categories of imported posts that do not exist yet.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError('Unknown input format, pass --format jsonl or --format csv.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        extra = {'create_categories': options['create_categories']} if options['model'] == 'post' else {}
+        importer = IMPORTERS[options['model']](batch_size=options['batch_size'], stderr=self.stderr, **extra)
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        except OSError as error:
+            raise CommandError(str(error))
+        with stream:
+            elapsed = importer.run(read_records(stream, fmt), progress=self._progress)
+
+        rate = importer.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.created} {options["model"]} records, skipped {importer.skipped} '
+            f'in {elapsed:.2f}s ({rate:.0f} records/s)'
+        ))
+
+    def _progress(self, importer, elapsed):
+        if elapsed - getattr(self, '_reported', 0) < PROGRESS_INTERVAL:
+            return
+        self._reported = elapsed
+        self.stdout.write(f'{importer.created} records in {elapsed:.0f}s ({importer.created / elapsed:.0f} records/s)')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.rankings import rebuild_rankings
+
+
+class Command(BaseCommand):
+    """
+    Recompute the trending and most discussed scores of every post.
+    """
+    help = 'Rebuild the materialized post rankings from votes and comments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows fetched and inserted per round trip.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_rankings(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Ranked {total} posts in {elapsed:.2f}s'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from blog.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the SQLite FTS5 index used by post search.
+    """
+    help = 'Rebuild the full-text search index of published posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of post IDs copied per statement.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            total = rebuild_index(batch_size=options['batch_size'])
+        except OperationalError as error:
+            raise CommandError(str(error))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} posts in {elapsed:.2f}s'))
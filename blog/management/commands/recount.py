@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from blog.managers import related_count
+from blog.models import Post, PostVote, Comment, CommentVote
+
+# (model, counter field, reverse relation it counts, filters of counted rows)
+COUNTERS = (
+    (Post, 'likes_count', 'votes', {'value': PostVote.LIKE}),
+    (Post, 'dislikes_count', 'votes', {'value': PostVote.DISLIKE}),
+    (Post, 'comments_count', 'comments', {}),
+    (Comment, 'likes_count', 'votes', {'value': CommentVote.LIKE}),
+    (Comment, 'dislikes_count', 'votes', {'value': CommentVote.DISLIKE}),
+)
+
+
+class Command(BaseCommand):
+    """
+    Reconcile stored reaction and comment counters with the actual rows.
+    """
+    help = 'Recalculate denormalized like, dislike and comment counters.'
+
+    def handle(self, *args, **options):
+        for model, field, related_name, filters in COUNTERS:
+            actual = related_count(model, related_name, **filters)
+            with transaction.atomic():
+                fixed = model.objects \
+                    .annotate(actual=actual) \
+                    .exclude(**{field: F('actual')}) \
+                    .update(**{field: actual})
+            self.stdout.write(f'{model.__name__}.{field}: {fixed} rows fixed')
+        self.stdout.write(self.style.SUCCESS('Counters are up to date'))
@@ -1,7 +1,190 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+from django.dispatch import Signal
 
+from .utils import date_range, recent_days_range
 
-class PostPublishedManager(models.Manager):
+# Sent by VoteQuerySet.toggle with the arguments target, user, value (the new
+# vote value, None when the vote was removed) and previous (the vote replaced
+# or removed, None if the user had not voted).
+vote_toggled = Signal()
+
+
+def related_count(model, related_name, **filters):
+    """
+    Build a subquery counting the rows of a reverse relation of model.
+
+    Args:
+        model: The model owning the reverse relation.
+        related_name (str): Name of the reverse relation, e.g. 'votes'.
+        **filters: Extra lookups the counted rows must match.
+
+    Returns:
+        Expression: Row count for the outer ``pk``, 0 when there are none.
+    """
+    field = model._meta.get_field(related_name)
+    target = field.field.name
+    counts = field.related_model.objects \
+        .filter(**{target: OuterRef('pk')}, **filters) \
+        .order_by() \
+        .values(target) \
+        .annotate(total=Count('pk')) \
+        .values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+class ReactionQuerySetMixin:
+    """
+    QuerySet mixin for models with a ``votes`` relation.
+    """
+
+    def _voted_by(self, user, value):
+        if not user.is_authenticated:
+            return Value(False)
+        field = self.model._meta.get_field('votes')
+        return Exists(field.related_model.objects.filter(**{field.field.name: OuterRef('pk')},
+                                                         user=user,
+                                                         value=value))
+
+    def with_reactions(self, user):
+        """
+        Annotate the reaction state of the given user.
+
+        Adds ``liked_by_user`` and ``disliked_by_user`` as correlated
+        subqueries, so a whole page of objects is loaded in a single query.
+        Reaction counts are stored on the rows themselves.
+
+        Args:
+            user: The user whose likes and dislikes are checked.
+        """
+        vote_model = self.model._meta.get_field('votes').related_model
+        return self.annotate(
+            liked_by_user=self._voted_by(user, vote_model.LIKE),
+            disliked_by_user=self._voted_by(user, vote_model.DISLIKE),
+        )
+
+
+class VoteQuerySet(models.QuerySet):
+    """
+    QuerySet for vote models, see blog.models.AbstractVote.
+    """
+
+    def toggle(self, target, user, value):
+        """
+        Toggle the vote of user on target.
+
+        Voting again with the same value removes the vote, any other value
+        replaces it through a single upsert. The stored counters of target
+        are adjusted in the same transaction, then vote_toggled is sent with
+        the replaced vote and the update time of the new one.
+
+        Args:
+            target: The voted Post or Comment.
+            user: The voting user.
+            value (int): LIKE or DISLIKE.
+
+        Returns:
+            int: The value of the user's vote after the toggle, None if removed.
+        """
+        model = self.model
+        lookup = {model.target_field: target, 'user': user}
+        updated = None
+
+        with transaction.atomic(using=self.db):
+            vote = self.filter(**lookup).only('id', 'value', 'updated', model.target_field).first()
+            if vote is not None and vote.value == value:
+                # The post_delete receiver uncounts the removed vote.
+                vote.delete()
+                value = None
+            else:
+                updated = self._upsert(target, user, value, vote).updated
+
+        vote_toggled.send(sender=model, target=target, user=user, value=value, previous=vote, updated=updated)
+        return value
+
+    def _upsert(self, target, user, value, previous):
+        model = self.model
+        lookup = {model.target_field: target, 'user': user}
+
+        vote = model(value=value, **lookup)
+        self.bulk_create([vote],
+                         update_conflicts=True,
+                         unique_fields=[model.target_field, 'user'],
+                         update_fields=['value', 'updated'])
+        counters = {model.COUNTER_FIELDS[value]: F(model.COUNTER_FIELDS[value]) + 1}
+        if previous is not None:
+            counters[model.COUNTER_FIELDS[previous.value]] = F(model.COUNTER_FIELDS[previous.value]) - 1
+        type(target).objects.filter(pk=target.pk).update(**counters)
+        return vote
+
+
+class PostQuerySet(ReactionQuerySetMixin, models.QuerySet):
+    """
+    QuerySet with shortcuts for common post listings.
+    """
+
+    # Enough characters for the 15 words shown on a list card.
+    EXCERPT_LENGTH = 300
+
+    # Columns rendered by a list card; everything else stays deferred.
+    LIST_FIELDS = (
+        'title',
+        'slug',
+        'publish',
+        'created',
+        'updated',
+        'image_url',
+        'author__username',
+        'category__name',
+        'category__slug',
+        'likes_count',
+        'dislikes_count',
+        'comments_count',
+    )
+
+    def for_list(self):
+        """
+        Return queryset optimized for rendering post cards.
+
+        Author and category are joined in the same query, the body is
+        replaced by a short ``excerpt`` and the remaining columns are deferred.
+        """
+        return self.select_related('author', 'category') \
+                   .only(*self.LIST_FIELDS) \
+                   .annotate(excerpt=Substr('body', 1, self.EXCERPT_LENGTH))
+
+    def published_in(self, year, month=None, day=None):
+        """
+        Filter posts published in the given year, month or day.
+
+        The period becomes a range on ``publish`` in the current time zone,
+        so the index on the column is used. Dates that do not exist match
+        no posts.
+
+        Args:
+            year (int): Year of publication.
+            month (int): Month of publication, the whole year if omitted.
+            day (int): Day of publication, the whole month if omitted.
+        """
+        try:
+            start, end = date_range(year, month, day)
+        except (ValueError, TypeError, OverflowError):
+            return self.none()
+        return self.filter(publish__gte=start, publish__lt=end)
+
+    def published_within(self, days):
+        """
+        Filter posts published during the last days, today included.
+
+        Args:
+            days (int): Number of calendar days, 1 means today only.
+        """
+        start, end = recent_days_range(days)
+        return self.filter(publish__gte=start, publish__lt=end)
+
+
+class PostPublishedManager(models.Manager.from_queryset(PostQuerySet)):
     """
     Manager for retrieving published posts.
     """
@@ -11,3 +194,9 @@ class PostPublishedManager(models.Manager):
         Return queryset containing only published posts.
         """
         return super(PostPublishedManager, self).get_queryset().filter(status='published')
+
+
+class CommentQuerySet(ReactionQuerySetMixin, models.QuerySet):
+    """
+    QuerySet for comments with reaction annotations.
+    """
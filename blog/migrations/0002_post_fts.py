@@ -0,0 +1,50 @@
+from django.db import migrations, OperationalError
+
+FTS_TABLE = 'blog_post_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """
+    Create and fill the FTS5 table when the database supports it.
+
+    Other databases, and SQLite builds compiled without FTS5, keep using the
+    icontains search fallback.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    Post = apps.get_model('blog', 'Post')
+    post_table = Post._meta.db_table
+    user_table = Post._meta.get_field('author').related_model._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                f"title, body, author, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            return
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, title, body, author) '
+            f'SELECT p.id, p.title, p.body, u.username FROM {post_table} p '
+            f'JOIN {user_table} u ON u.id = p.author_id '
+            f"WHERE p.status = 'published'"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.2 on 2026-10-17 22:55
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Initialize the new counters from the existing reaction and comment rows.
+    """
+    counters = (
+        ('Post', 'likes_count', 'PostLike', 'post'),
+        ('Post', 'dislikes_count', 'PostDislike', 'post'),
+        ('Post', 'comments_count', 'Comment', 'post'),
+        ('Comment', 'likes_count', 'CommentLike', 'comment'),
+        ('Comment', 'dislikes_count', 'CommentDislike', 'comment'),
+    )
+    for model_name, field, row_model_name, target in counters:
+        model = apps.get_model('blog', model_name)
+        row_model = apps.get_model('blog', row_model_name)
+        counts = row_model.objects \
+            .filter(**{target: OuterRef('pk')}) \
+            .order_by() \
+            .values(target) \
+            .annotate(total=Count('pk')) \
+            .values('total')
+        model.objects.update(**{field: Coalesce(Subquery(counts), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dislikes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
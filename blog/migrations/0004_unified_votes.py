@@ -0,0 +1,156 @@
+# Generated by Django 5.0.2 on 2026-10-17 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+LIKE = 1
+DISLIKE = -1
+
+# (vote model, target field, like model, dislike model)
+VOTE_MODELS = (
+    ('PostVote', 'post', 'PostLike', 'PostDislike'),
+    ('CommentVote', 'comment', 'CommentLike', 'CommentDislike'),
+)
+
+
+def copy_timestamps(rows, sources, target, **fields):
+    """
+    Copy timestamps onto rows from the source row of the same target and user.
+
+    bulk_create fills the auto_now and auto_now_add fields with the current
+    time, update() leaves them alone. Fields map a field of rows to the
+    source field it takes its value from.
+    """
+    matching = sources.filter(**{target: OuterRef(target)}, user=OuterRef('user'))
+    rows.update(**{field: Subquery(matching.values(source)[:1]) for field, source in fields.items()})
+
+
+def copy_reactions_to_votes(apps, schema_editor):
+    """
+    Move rows of the like and dislike tables into the signed vote tables.
+
+    The voting views never let a user like and dislike the same object, but
+    if both rows exist the like wins. The unique constraint of the vote
+    tables is only created at the end of the migration, so the dropped
+    dislikes are filtered out here. Votes keep the time of their reaction.
+    """
+    for vote_name, target, like_name, dislike_name in VOTE_MODELS:
+        Vote = apps.get_model('blog', vote_name)
+        Like = apps.get_model('blog', like_name)
+        liked = Like.objects.filter(**{target: OuterRef(target)}, user=OuterRef('user'))
+        sources = (
+            (Like.objects.all(), LIKE),
+            (apps.get_model('blog', dislike_name).objects.exclude(Exists(liked)), DISLIKE),
+        )
+        for reactions, value in sources:
+            rows = reactions \
+                .values_list(f'{target}_id', 'user_id') \
+                .iterator(chunk_size=2000)
+            batch = []
+            for target_id, user_id in rows:
+                batch.append(Vote(**{f'{target}_id': target_id}, user_id=user_id, value=value))
+                if len(batch) == 2000:
+                    Vote.objects.bulk_create(batch)
+                    batch = []
+            Vote.objects.bulk_create(batch)
+            copy_timestamps(Vote.objects.filter(value=value), reactions, target, created='created', updated='created')
+
+
+def recount_votes(apps, schema_editor):
+    """
+    Recompute the like and dislike counters from the copied votes.
+
+    The counters were filled from the reaction tables, they still count the
+    dropped dislikes of users who also liked the object.
+    """
+    for vote_name, target, like_name, dislike_name in VOTE_MODELS:
+        Vote = apps.get_model('blog', vote_name)
+        model = Vote._meta.get_field(target).related_model
+        for field, value in (('likes_count', LIKE), ('dislikes_count', DISLIKE)):
+            counts = Vote.objects \
+                .filter(**{target: OuterRef('pk')}, value=value) \
+                .order_by() \
+                .values(target) \
+                .annotate(total=Count('pk')) \
+                .values('total')
+            model.objects.update(**{field: Coalesce(Subquery(counts), 0)})
+
+
+def copy_votes_to_reactions(apps, schema_editor):
+    """
+    Move the signed votes back into the like and dislike tables.
+
+    A reaction is as old as the last change of its vote.
+    """
+    for vote_name, target, like_name, dislike_name in VOTE_MODELS:
+        Vote = apps.get_model('blog', vote_name)
+        for reaction_name, value in ((like_name, LIKE), (dislike_name, DISLIKE)):
+            Reaction = apps.get_model('blog', reaction_name)
+            votes = Vote.objects.filter(value=value)
+            rows = votes \
+                .values_list(f'{target}_id', 'user_id') \
+                .iterator(chunk_size=2000)
+            batch = []
+            for target_id, user_id in rows:
+                batch.append(Reaction(**{f'{target}_id': target_id}, user_id=user_id))
+                if len(batch) == 2000:
+                    Reaction.objects.bulk_create(batch)
+                    batch = []
+            Reaction.objects.bulk_create(batch)
+            copy_timestamps(Reaction.objects.all(), votes, target, created='updated')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_reaction_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.SmallIntegerField(choices=[(1, 'Like'), (-1, 'Dislike')])),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='blog.comment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('comment', 'user')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PostVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.SmallIntegerField(choices=[(1, 'Like'), (-1, 'Dislike')])),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='blog.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_votes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('post', 'user')},
+            },
+        ),
+        migrations.RunPython(copy_reactions_to_votes, copy_votes_to_reactions),
+        migrations.RunPython(recount_votes, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='CommentDislike',
+        ),
+        migrations.DeleteModel(
+            name='CommentLike',
+        ),
+        migrations.DeleteModel(
+            name='PostDislike',
+        ),
+        migrations.DeleteModel(
+            name='PostLike',
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-17 23:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_unified_votes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-updated', '-created', '-id'], name='blog_comment_post_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentvote',
+            index=models.Index(fields=['user', '-updated'], name='blog_commentvote_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['-publish', '-created', '-id'], name='blog_post_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['category', '-publish', '-created', '-id'], name='blog_post_category_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'published')), fields=['author', '-publish', '-created', '-id'], name='blog_post_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['slug', 'publish'], name='blog_post_slug_publish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postvote',
+            index=models.Index(fields=['user', '-updated'], name='blog_postvote_user_idx'),
+        ),
+    ]
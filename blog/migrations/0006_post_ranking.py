@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 23:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRanking',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='blog.post')),
+                ('is_published', models.BooleanField(default=False)),
+                ('trending', models.FloatField(default=0)),
+                ('discussion', models.FloatField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.category')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_published', True)), fields=['-trending', '-post'], name='blog_rank_trending_idx'), models.Index(condition=models.Q(('is_published', True)), fields=['category', '-trending', '-post'], name='blog_rank_cat_trending_idx'), models.Index(condition=models.Q(('is_published', True)), fields=['-discussion', '-post'], name='blog_rank_discussion_idx'), models.Index(condition=models.Q(('is_published', True)), fields=['category', '-discussion', '-post'], name='blog_rank_cat_discussion_idx')],
+            },
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Q
 from django.urls import reverse
 from django.utils import timezone
 
-from .managers import PostPublishedManager
+from .managers import PostPublishedManager, CommentQuerySet, VoteQuerySet
 
 User = get_user_model()
 
@@ -47,59 +48,103 @@ class Post(models.Model):
     category = models.ForeignKey(Category,
                                  on_delete=models.CASCADE,
                                  related_name='posts')
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    dislikes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
     objects = models.Manager()
     published = PostPublishedManager()
+    loaded_publish = None
 
     class Meta:
         ordering = ('-publish', '-created')
+        indexes = [
+            # Listings of published posts, in the cursor pagination order.
+            models.Index(fields=['-publish', '-created', '-id'],
+                         condition=Q(status='published'),
+                         name='blog_post_published_idx'),
+            models.Index(fields=['category', '-publish', '-created', '-id'],
+                         condition=Q(status='published'),
+                         name='blog_post_category_pub_idx'),
+            models.Index(fields=['author', '-publish', '-created', '-id'],
+                         condition=Q(status='published'),
+                         name='blog_post_author_pub_idx'),
+            # Detail pages are looked up by slug and publication date.
+            models.Index(fields=['slug', 'publish'], name='blog_post_slug_publish_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Publication date as loaded, rankings move the publish event when it changes.
+        post.loaded_publish = post.__dict__.get('publish')
+        return post
+
     def get_absolute_url(self):
+        # Detail lookups match the publish day in the current time zone.
+        publish = timezone.localtime(self.publish)
         return reverse('blog:post_detail',
-                       args=[self.publish.year,
-                             self.publish.month,
-                             self.publish.day,
+                       args=[publish.year,
+                             publish.month,
+                             publish.day,
                              self.slug])
 
     def is_liked_by(self, user):
-        return self.likes.filter(user=user).exists()
+        return self.votes.filter(user=user, value=PostVote.LIKE).exists()
 
     def is_disliked_by(self, user):
-        return self.dislikes.filter(user=user).exists()
+        return self.votes.filter(user=user, value=PostVote.DISLIKE).exists()
 
 
-class PostLike(models.Model):
+class AbstractVote(models.Model):
     """
-    Model representing a like on a blog post.
+    Abstract model for a signed vote of a user on a target.
+
+    Attributes:
+        target_field (str): Name of the foreign key to the voted object.
+        COUNTER_FIELDS (dict): Counter of the target fed by each vote value.
     """
-    post = models.ForeignKey(Post,
-                             on_delete=models.CASCADE,
-                             related_name='likes')
-    user = models.ForeignKey(User,
-                             on_delete=models.CASCADE,
-                             related_name='post_likes')
+    LIKE = 1
+    DISLIKE = -1
+    VALUE_CHOICES = (
+        (LIKE, 'Like'),
+        (DISLIKE, 'Dislike'),
+    )
+    COUNTER_FIELDS = {
+        LIKE: 'likes_count',
+        DISLIKE: 'dislikes_count',
+    }
+    target_field = None
+
+    value = models.SmallIntegerField(choices=VALUE_CHOICES)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    objects = VoteQuerySet.as_manager()
 
     class Meta:
-        unique_together = ('post', 'user')
+        abstract = True
 
 
-class PostDislike(models.Model):
+class PostVote(AbstractVote):
     """
-    Model representing a dislike on a blog post.
+    Model representing a like or dislike on a blog post.
     """
+    target_field = 'post'
+
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
-                             related_name='dislikes')
+                             related_name='votes')
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
-                             related_name='post_dislikes')
-    created = models.DateTimeField(auto_now_add=True)
+                             related_name='post_votes')
 
     class Meta:
         unique_together = ('post', 'user')
+        indexes = [
+            models.Index(fields=['user', '-updated'], name='blog_postvote_user_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -116,47 +161,80 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     active = models.BooleanField(default=True)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    dislikes_count = models.PositiveIntegerField(default=0, editable=False)
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('-updated', '-created')
+        indexes = [
+            models.Index(fields=['post', '-updated', '-created', '-id'], name='blog_comment_post_recent_idx'),
+        ]
 
     def __str__(self):
         return f'{self.author} - {self.post.title}'
 
     def is_liked_by(self, user):
-        return self.likes.filter(user=user).exists()
+        return self.votes.filter(user=user, value=CommentVote.LIKE).exists()
 
     def is_disliked_by(self, user):
-        return self.dislikes.filter(user=user).exists()
+        return self.votes.filter(user=user, value=CommentVote.DISLIKE).exists()
 
 
-class CommentLike(models.Model):
+class CommentVote(AbstractVote):
     """
-    Model representing a like on a comment.
+    Model representing a like or dislike on a comment.
     """
+    target_field = 'comment'
+
     comment = models.ForeignKey(Comment,
                                 on_delete=models.CASCADE,
-                                related_name='likes')
+                                related_name='votes')
     user = models.ForeignKey(User,
                              on_delete=models.CASCADE,
-                             related_name='comments_likes')
-    created = models.DateTimeField(auto_now_add=True)
+                             related_name='comment_votes')
 
     class Meta:
         unique_together = ('comment', 'user')
+        indexes = [
+            models.Index(fields=['user', '-updated'], name='blog_commentvote_user_idx'),
+        ]
 
 
-class CommentDislike(models.Model):
+class PostRanking(models.Model):
     """
-    Model representing a dislike on a comment.
+    Materialized time-decayed scores of a post, maintained by blog.rankings.
+
+    Category and publication state are copied from the post, so a ranking
+    is read from this table and its indexes alone.
+    Scores are stored in log form, see blog.rankings.add.
     """
-    comment = models.ForeignKey(Comment,
+    post = models.OneToOneField(Post,
                                 on_delete=models.CASCADE,
-                                related_name='dislikes')
-    user = models.ForeignKey(User,
-                             on_delete=models.CASCADE,
-                             related_name='comments_dislikes')
-    created = models.DateTimeField(auto_now_add=True)
+                                primary_key=True,
+                                related_name='ranking')
+    category = models.ForeignKey(Category,
+                                 on_delete=models.CASCADE,
+                                 related_name='+')
+    is_published = models.BooleanField(default=False)
+    trending = models.FloatField(default=0)
+    discussion = models.FloatField(default=0)
 
     class Meta:
-        unique_together = ('comment', 'user')
+        indexes = [
+            models.Index(fields=['-trending', '-post'],
+                         condition=Q(is_published=True),
+                         name='blog_rank_trending_idx'),
+            models.Index(fields=['category', '-trending', '-post'],
+                         condition=Q(is_published=True),
+                         name='blog_rank_cat_trending_idx'),
+            models.Index(fields=['-discussion', '-post'],
+                         condition=Q(is_published=True),
+                         name='blog_rank_discussion_idx'),
+            models.Index(fields=['category', '-discussion', '-post'],
+                         condition=Q(is_published=True),
+                         name='blog_rank_cat_discussion_idx'),
+        ]
+
+    def __str__(self):
+        return f'Ranking of post {self.post_id}'
@@ -0,0 +1,256 @@
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import get_or_set, RANKING_KEY, RANKING_TIMEOUT
+from .models import Post, PostVote, Comment, PostRanking
+
+# Score an event adds to each ranking before the time decay.
+WEIGHTS = {
+    'trending': {'publish': 1.0, 'like': 1.0, 'dislike': -0.5, 'comment': 2.0},
+    'discussion': {'comment': 1.0},
+}
+
+VOTE_EVENTS = {
+    PostVote.LIKE: 'like',
+    PostVote.DISLIKE: 'dislike',
+}
+
+DEFAULT_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DEFAULT_HALF_LIFE = {'trending': 48, 'discussion': 24 * 7}
+
+
+def half_lives(ranking, moment):
+    """
+    Return the number of half lives between the ranking epoch and moment.
+
+    Instead of shrinking every stored score as time passes, newer events
+    get exponentially larger weights: one half life later an event counts
+    twice as much. The order of the scores is the same as with real decay,
+    so an event never has to touch any other row.
+
+    Args:
+        ranking (str): Key of WEIGHTS.
+        moment (datetime): When the event happened.
+
+    Returns:
+        float: log2 of the weight multiplier of the event.
+    """
+    epoch = getattr(settings, 'BLOG_RANKING_EPOCH', DEFAULT_EPOCH)
+    half_life = getattr(settings, 'BLOG_RANKING_HALF_LIFE', DEFAULT_HALF_LIFE)[ranking]
+    return (moment - epoch).total_seconds() / (half_life * 3600)
+
+
+def _split(score):
+    """
+    Return the sign and the log2 of the absolute value of the sum stored as score.
+    """
+    if not score:
+        return 0, -math.inf
+    magnitude = abs(score)
+    # log2(2 ** magnitude - 1), without computing the power.
+    return math.copysign(1, score), magnitude + math.log2(-math.expm1(-magnitude * math.log(2)))
+
+
+def _join(sign, exponent):
+    """
+    Return the stored score of the sum sign * 2 ** exponent.
+    """
+    if not sign:
+        return 0.0
+    if exponent > 0:
+        return sign * (exponent + math.log1p(2 ** -exponent) / math.log(2))
+    return sign * math.log1p(2 ** exponent) / math.log(2)
+
+
+def add(score, sign, exponent):
+    """
+    Add sign * 2 ** exponent to a stored score.
+
+    The weighted sums grow by one per half life in log2 and would overflow a
+    float after about a thousand half lives, so they are stored as
+    sign(sum) * log2(1 + |sum|). The stored scores sort like the sums, also
+    when dislikes or taken back events make them negative, and additions are
+    done on the logarithms.
+
+    Args:
+        score (float): Stored score.
+        sign (int): 1 or -1.
+        exponent (float): log2 of the absolute value to add.
+
+    Returns:
+        float: The new stored score.
+    """
+    current_sign, current = _split(score)
+    if current < exponent:
+        current_sign, current, sign, exponent = sign, exponent, current_sign, current
+    if not sign:
+        return _join(current_sign, current)
+    difference = exponent - current
+    if sign == current_sign:
+        return _join(current_sign, current + math.log1p(2 ** difference) / math.log(2))
+    if difference == 0:
+        return 0.0
+    return _join(current_sign, current + math.log2(-math.expm1(difference * math.log(2))))
+
+
+def _add_events(scores, events):
+    for event, moment, sign in events:
+        for ranking, weights in WEIGHTS.items():
+            weight = weights.get(event)
+            if weight:
+                scores[ranking] = add(scores[ranking],
+                                      sign if weight > 0 else -sign,
+                                      math.log2(abs(weight)) + half_lives(ranking, moment))
+    return scores
+
+
+def _scores(events):
+    return _add_events(dict.fromkeys(WEIGHTS, 0.0), events)
+
+
+def record(post_id, events):
+    """
+    Add events to the stored scores of a post.
+
+    The row is locked while its scores are updated. SQLite has no row locks:
+    write views hold the write lock in IMMEDIATE transactions, and elsewhere
+    a concurrent write makes the update fail instead of getting lost.
+    Posts without a ranking row are skipped,
+    rows are created when the post is saved or by rebuild_rankings.
+
+    Args:
+        post_id (int): ID of the post.
+        events (list): (event, moment, sign) tuples, sign is -1 to take an
+            event back.
+    """
+    with transaction.atomic(savepoint=False):
+        scores = PostRanking.objects.select_for_update() \
+            .filter(post_id=post_id) \
+            .values(*WEIGHTS) \
+            .first()
+        if scores is None:
+            return
+        changes = {ranking: score for ranking, score in _add_events(dict(scores), events).items()
+                   if score != scores[ranking]}
+        if changes:
+            PostRanking.objects.filter(post_id=post_id).update(**changes)
+
+
+def update_post(post, created=False, previous_publish=None):
+    """
+    Bring the ranking row of a saved post up to date without reading its votes and comments.
+
+    New posts get a row scoring their publication. Other posts get their
+    category and status copied, and their publish event moved if the
+    publication date changed. Posts without a row are left to rebuild_rankings.
+
+    Args:
+        post (Post): The saved post.
+        created (bool): Whether the post was just inserted.
+        previous_publish (datetime): Publication date the post had before, None if unknown.
+    """
+    fields = {'category_id': post.category_id, 'is_published': post.status == 'published'}
+    if created:
+        PostRanking.objects.create(post_id=post.pk, **fields, **_scores([('publish', post.publish, 1)]))
+        return
+    with transaction.atomic(savepoint=False):
+        PostRanking.objects.filter(post_id=post.pk).update(**fields)
+        if previous_publish is not None and previous_publish != post.publish:
+            record(post.pk, [('publish', previous_publish, -1), ('publish', post.publish, 1)])
+
+
+def rank_new_posts(posts, batch_size=1000):
+    """
+    Create the ranking rows of posts inserted with bulk_create.
+
+    New posts have no votes or comments yet, only their publication counts.
+
+    Args:
+        posts (list): Saved posts.
+        batch_size (int): Rows inserted per statement.
+    """
+    rows = [PostRanking(post_id=post.pk,
+                        category_id=post.category_id,
+                        is_published=post.status == 'published',
+                        **_scores([('publish', post.publish, 1)]))
+            for post in posts]
+    PostRanking.objects.bulk_create(rows, batch_size=batch_size)
+
+
+def rebuild_rankings(batch_size=1000):
+    """
+    Recompute every ranking row from scratch.
+
+    Posts, votes and comments are streamed once each, only the scores of
+    the posts are kept in memory. Reading and replacing the table happen in
+    one transaction, so no vote or comment is missed meanwhile.
+
+    Args:
+        batch_size (int): Rows fetched and inserted per round trip.
+
+    Returns:
+        int: Number of ranked posts.
+    """
+    with transaction.atomic():
+        rows = {}
+        posts = Post.objects.values_list('id', 'category_id', 'status', 'publish')
+        for post_id, category_id, status, publish in posts.iterator(chunk_size=batch_size):
+            row = PostRanking(post_id=post_id, category_id=category_id, is_published=status == 'published')
+            for ranking, score in _scores([('publish', publish, 1)]).items():
+                setattr(row, ranking, score)
+            rows[post_id] = row
+
+        votes = ((post_id, VOTE_EVENTS[value], updated)
+                 for post_id, value, updated in PostVote.objects.values_list('post_id', 'value', 'updated')
+                 .iterator(chunk_size=batch_size))
+        comments = ((post_id, 'comment', created)
+                    for post_id, created in Comment.objects.values_list('post_id', 'created')
+                    .iterator(chunk_size=batch_size))
+        for events in (votes, comments):
+            for post_id, event, moment in events:
+                row = rows.get(post_id)
+                if row is None:
+                    continue
+                scores = _add_events({ranking: getattr(row, ranking) for ranking in WEIGHTS},
+                                     [(event, moment, 1)])
+                for ranking, score in scores.items():
+                    setattr(row, ranking, score)
+
+        PostRanking.objects.all().delete()
+        PostRanking.objects.bulk_create(rows.values(), batch_size=batch_size)
+    return len(rows)
+
+
+def top_posts(ranking, category=None, limit=10):
+    """
+    Return the best ranked published posts, ready for post cards.
+
+    The ordered post IDs come from the ranking indexes and are cached for
+    RANKING_TIMEOUT seconds; the posts themselves are loaded by primary key.
+
+    Args:
+        ranking (str): 'trending' or 'discussion'.
+        category (str): Slug of a category to rank within, all posts if omitted.
+        limit (int): Number of posts.
+
+    Returns:
+        list: Posts in ranking order.
+
+    Raises:
+        ValueError: If the ranking does not exist.
+    """
+    if ranking not in WEIGHTS:
+        raise ValueError(f'Unknown ranking {ranking!r}')
+
+    def compute():
+        rankings = PostRanking.objects.filter(is_published=True)
+        if category is not None:
+            rankings = rankings.filter(category__slug=category)
+        return list(rankings.order_by(f'-{ranking}', '-post_id').values_list('post_id', flat=True)[:limit])
+
+    ids = get_or_set(RANKING_KEY.format(ranking, category or '', limit), compute, RANKING_TIMEOUT, namespace='ranking')
+    posts = Post.published.for_list().in_bulk(ids)
+    return [posts[post_id] for post_id in ids if post_id in posts]
@@ -0,0 +1,229 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router, transaction, OperationalError
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+FTS_TABLE = 'blog_post_fts'
+
+# bm25 column weights for (title, body, author).
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Control characters wrapped around matches by snippet(); they can not occur
+# in user content, so the snippet can be escaped safely before highlighting.
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+
+def fts_available(using=DEFAULT_DB_ALIAS):
+    """
+    Check if the full-text index exists on a database.
+
+    The answer is kept for the lifetime of the database connection, so a
+    table created later, e.g. by migrate in another process, is noticed on
+    the next connection.
+
+    Args:
+        using (str): Database alias, the primary by default.
+
+    Returns:
+        bool: True if the FTS5 table is present, False otherwise.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return False
+    conn.ensure_connection()
+    checked = getattr(conn, 'blog_fts_checked', None)
+    if checked is None or checked[0] is not conn.connection:
+        conn.blog_fts_checked = (conn.connection, FTS_TABLE in conn.introspection.table_names())
+    return conn.blog_fts_checked[1]
+
+
+def build_match_query(search_query):
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, so FTS5 syntax characters typed
+    by the user are never interpreted.
+
+    Args:
+        search_query (str): Text entered by the user.
+
+    Returns:
+        str: MATCH expression, empty if the input has no words.
+    """
+    words = re.findall(r'\w+', search_query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def highlight(snippet):
+    """
+    Escape an FTS snippet and wrap matched terms in <mark> tags.
+    """
+    html = escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+    return mark_safe(html)
+
+
+class FullTextResults:
+    """
+    Lazy, paginator-friendly sequence of published posts matching a query.
+
+    Slicing runs one ranked FTS query for the requested window and one query
+    loading the posts, so memory does not depend on the number of matches.
+    Both run on the database the router picks for reading posts.
+    """
+
+    def __init__(self, search_query):
+        self.match = build_match_query(search_query)
+        self.using = router.db_for_read(Post)
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.match])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+
+        start = index.start or 0
+        limit = -1 if index.stop is None else index.stop - start
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, '
+                f'snippet({FTS_TABLE}, -1, %s, %s, %s, 15) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [_MATCH_START, _MATCH_END, '…', self.match, limit, start]
+            )
+            hits = cursor.fetchall()
+
+        posts = Post.published.db_manager(self.using).for_list().in_bulk([post_id for post_id, _, _ in hits])
+        results = []
+        for post_id, rank, snippet in hits:
+            post = posts.get(post_id)
+            if post is None:
+                continue
+            post.rank = rank
+            post.snippet = highlight(snippet)
+            results.append(post)
+        return results
+
+
+def index_post(post):
+    """
+    Add or refresh a post in the full-text index, or drop it if it is not published.
+
+    Args:
+        post (Post): The post that has been saved.
+    """
+    if not fts_available():
+        return
+    if post.status != 'published':
+        unindex_post(post.pk)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, body, author) VALUES (%s, %s, %s, %s)',
+            [post.pk, post.title, post.body, post.author.username]
+        )
+
+
+def index_posts(posts):
+    """
+    Add many new posts to the full-text index with one statement.
+
+    Used after bulk_create, which sends no post_save signals. Unpublished
+    posts are skipped.
+
+    Args:
+        posts (list): Saved posts with their author loaded.
+    """
+    if not fts_available():
+        return
+    rows = [(post.pk, post.title, post.body, post.author.username)
+            for post in posts if post.status == 'published']
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE}(rowid, title, body, author) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def unindex_post(post_id):
+    """
+    Remove a post from the full-text index.
+
+    Args:
+        post_id (int): ID of the post.
+    """
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def reindex_author(user):
+    """
+    Refresh the author column of every indexed post written by user.
+
+    Args:
+        user: The author whose username may have changed.
+    """
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET author = %s WHERE rowid IN '
+            f'(SELECT id FROM {Post._meta.db_table} WHERE author_id = %s)',
+            [user.username, user.pk]
+        )
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuild the full-text index from the posts table.
+
+    Published posts are copied in primary key ranges of batch_size rows inside
+    one transaction, so searches never see a half-built index.
+
+    Args:
+        batch_size (int): Number of post IDs handled per statement.
+
+    Returns:
+        int: Number of indexed posts.
+
+    Raises:
+        OperationalError: If the FTS table does not exist.
+    """
+    # Checked again, the table may have been created since the last check.
+    connection.blog_fts_checked = None
+    if not fts_available():
+        raise OperationalError(f'Full-text table {FTS_TABLE} does not exist, run migrate first.')
+
+    post_table = Post._meta.db_table
+    user_table = Post._meta.get_field('author').related_model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {post_table}')
+        max_id = cursor.fetchone()[0]
+        for start in range(0, max_id, batch_size):
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, body, author) '
+                f'SELECT p.id, p.title, p.body, u.username FROM {post_table} p '
+                f'JOIN {user_table} u ON u.id = p.author_id '
+                f"WHERE p.status = 'published' AND p.id > %s AND p.id <= %s",
+                [start, start + batch_size]
+            )
+        cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
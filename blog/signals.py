@@ -0,0 +1,270 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import rankings, search
+from .cache import (
+    invalidate_navigation,
+    invalidate_sitemaps,
+    invalidate_tags,
+    sitemap_chunk,
+    post_tag,
+    category_tag,
+    author_tag,
+    NAV_CATEGORIES_KEY,
+    NAV_AUTHORS_KEY,
+    NAV_ARCHIVE_KEY,
+    POST_LIST_TAG
+)
+from .managers import vote_toggled
+from .models import Category, Post, PostVote, Comment, CommentVote
+
+User = get_user_model()
+
+
+# Models whose deletion cascades to the post or comment counting or ranking a deleted row.
+PARENT_DELETING_MODELS = {
+    Comment: (Post, Category),
+    PostVote: (Post, Category),
+    CommentVote: (Comment, Post, Category),
+}
+
+
+def adjust_counter(model, pk, field, delta):
+    """
+    Atomically add delta to a stored counter of a row.
+    """
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def deleted_with_parent(sender, origin):
+    """
+    Tell whether a comment or vote is deleted in the cascade of the post or comment it belongs to.
+
+    The parent goes away with its counters and ranking row, so they are not updated once per child.
+    Deletions starting from a user may remove other users' posts, they are not skipped.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, PARENT_DELETING_MODELS[sender])
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    """
+    Keep the full-text index in sync with a saved post.
+    """
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    """
+    Drop a deleted post from the full-text index.
+    """
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reindex_renamed_author(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Refresh indexed author names when a username may have changed.
+    """
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    search.reindex_author(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    """
+    Count a newly created comment on its post.
+    """
+    if created and not raw:
+        adjust_counter(Post, instance.post_id, 'comments_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, origin=None, **kwargs):
+    """
+    Uncount a deleted comment, unless its post is deleted too.
+    """
+    if not deleted_with_parent(sender, origin):
+        adjust_counter(Post, instance.post_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=PostVote)
+@receiver(post_save, sender=CommentVote)
+def count_new_vote(sender, instance, created, raw=False, **kwargs):
+    """
+    Count a vote saved as a model instance.
+
+    Votes cast through VoteQuerySet.toggle are written by an upsert that
+    sends no signal, and toggle adjusts the counters itself.
+    """
+    if created and not raw:
+        target = sender._meta.get_field(sender.target_field)
+        adjust_counter(target.related_model, getattr(instance, target.attname),
+                       sender.COUNTER_FIELDS[instance.value], 1)
+
+
+@receiver(post_delete, sender=PostVote)
+@receiver(post_delete, sender=CommentVote)
+def uncount_deleted_vote(sender, instance, origin=None, **kwargs):
+    """
+    Uncount a deleted vote, also when it is removed by toggle or the cascade of a user.
+    """
+    if deleted_with_parent(sender, origin):
+        return
+    target = sender._meta.get_field(sender.target_field)
+    adjust_counter(target.related_model, getattr(instance, target.attname),
+                   sender.COUNTER_FIELDS[instance.value], -1)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_navigation(sender, **kwargs):
+    """
+    Drop the cached category list and category sitemap after a category changes.
+    """
+    invalidate_navigation(NAV_CATEGORIES_KEY)
+    invalidate_sitemaps()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_navigation(sender, **kwargs):
+    """
+    Drop the cached author list and month archive, a post may change both.
+    """
+    invalidate_navigation(NAV_AUTHORS_KEY, NAV_ARCHIVE_KEY)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_sitemap(sender, instance, **kwargs):
+    """
+    Drop the sitemap chunk listing the post, the other chunks stay cached.
+    """
+    invalidate_sitemaps(sitemap_chunk(instance.pk))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_navigation(sender, created=False, update_fields=None, **kwargs):
+    """
+    Drop the cached author list and author sitemap when an author may have been renamed or removed.
+
+    New users have no posts yet and logins only update last_login.
+    """
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    invalidate_navigation(NAV_AUTHORS_KEY)
+    invalidate_sitemaps()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    """
+    Drop cached pages showing the post or listing its category and author.
+    """
+    invalidate_tags(post_tag(instance.pk),
+                    category_tag(instance.category.slug),
+                    author_tag(instance.author.username),
+                    POST_LIST_TAG)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_pages(sender, instance, **kwargs):
+    """
+    Drop cached pages showing the commented post.
+    """
+    invalidate_tags(post_tag(instance.post_id))
+
+
+def _voted_post_id(sender, target):
+    return target.pk if sender is PostVote else target.post_id
+
+
+@receiver(vote_toggled, sender=PostVote)
+@receiver(vote_toggled, sender=CommentVote)
+def invalidate_voted_post_pages(sender, target, **kwargs):
+    """
+    Drop cached pages showing the post a vote was toggled on.
+    """
+    invalidate_tags(post_tag(_voted_post_id(sender, target)))
+
+
+@receiver(post_delete, sender=PostVote)
+def invalidate_unvoted_post_pages(sender, instance, **kwargs):
+    """
+    Drop cached pages showing the post a vote was deleted from, e.g. in the admin.
+
+    Comment votes are left out: deleting them outside of toggle only happens
+    in cascades, where the comment or post receivers already drop the pages.
+    """
+    invalidate_tags(post_tag(instance.post_id))
+
+
+@receiver(post_save, sender=Post)
+def rank_saved_post(sender, instance, created, raw=False, **kwargs):
+    """
+    Update the ranking row of a saved post, its category, status or publication date may have changed.
+    """
+    if raw:
+        return
+    rankings.update_post(instance, created, instance.loaded_publish)
+    instance.loaded_publish = instance.publish
+
+
+@receiver(vote_toggled, sender=PostVote)
+def rank_toggled_post_vote(sender, target, value, previous=None, updated=None, **kwargs):
+    """
+    Score a new or changed post vote; removed votes are taken back on post_delete.
+
+    The vote is scored at its stored update time, the one used to take it back.
+    """
+    if value is None:
+        return
+    events = [(rankings.VOTE_EVENTS[value], updated, 1)]
+    if previous is not None:
+        events.append((rankings.VOTE_EVENTS[previous.value], previous.updated, -1))
+    rankings.record(target.pk, events)
+
+
+@receiver(post_save, sender=PostVote)
+def rank_new_post_vote(sender, instance, created, raw=False, **kwargs):
+    """
+    Score a post vote saved as a model instance.
+    """
+    if created and not raw:
+        rankings.record(instance.post_id, [(rankings.VOTE_EVENTS[instance.value], instance.updated, 1)])
+
+
+@receiver(post_delete, sender=PostVote)
+def unrank_deleted_post_vote(sender, instance, origin=None, **kwargs):
+    """
+    Take back the score of a deleted post vote, unless its post is deleted too.
+    """
+    if not deleted_with_parent(sender, origin):
+        rankings.record(instance.post_id, [(rankings.VOTE_EVENTS[instance.value], instance.updated, -1)])
+
+
+@receiver(post_save, sender=Comment)
+def rank_new_comment(sender, instance, created, raw=False, **kwargs):
+    """
+    Score a new comment on its post.
+    """
+    if created and not raw:
+        rankings.record(instance.post_id, [('comment', instance.created, 1)])
+
+
+@receiver(post_delete, sender=Comment)
+def unrank_deleted_comment(sender, instance, origin=None, **kwargs):
+    """
+    Take back the score of a deleted comment, unless its post is deleted too.
+    """
+    if not deleted_with_parent(sender, origin):
+        rankings.record(instance.post_id, [('comment', instance.created, -1)])
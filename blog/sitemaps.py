@@ -0,0 +1,174 @@
+import time
+
+from django.db.models import F, Max
+from django.http import Http404
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import (
+    get_or_set,
+    SITEMAP_CHUNK_SIZE,
+    SITEMAP_INDEX_KEY,
+    SITEMAP_CHUNK_KEY,
+    SITEMAP_PAGES_KEY
+)
+from .models import Post
+
+# Rows fetched per keyset query while a chunk is generated.
+SITEMAP_BATCH_SIZE = 1000
+
+
+def _sitemap(entries):
+    """
+    Wrap sitemap entries with the validators of the generated sitemap.
+
+    Dates are formatted once here, rendering a cached sitemap only
+    interpolates strings.
+    """
+    return {
+        'entries': [(key, timezone.localtime(lastmod).isoformat()) for key, lastmod in entries],
+        'lastmod': max((lastmod for _, lastmod in entries), default=None),
+        'version': time.time_ns(),
+    }
+
+
+def index_entries():
+    """
+    Return the cached post chunks of the sitemap index.
+
+    A single aggregate groups the published posts by chunk, chunks without
+    published posts are left out.
+
+    Returns:
+        dict: Sitemap of (chunk number, last update) entries.
+    """
+    def compute():
+        chunks = (Post.published.annotate(chunk=F('id') / SITEMAP_CHUNK_SIZE)
+                  .values('chunk').annotate(lastmod=Max('updated')).order_by('chunk'))
+        return _sitemap([(row['chunk'], row['lastmod']) for row in chunks])
+
+    return get_or_set(SITEMAP_INDEX_KEY, compute, None, namespace='sitemap')
+
+
+def chunk_entries(chunk):
+    """
+    Return the cached post entries of one sitemap chunk.
+
+    The posts with IDs in the chunk range are read in ID order with keyset
+    pagination, so every query starts at an index position instead of
+    skipping rows with OFFSET.
+
+    Args:
+        chunk (int): Chunk number, the chunk holds the IDs from
+            chunk * SITEMAP_CHUNK_SIZE to the next multiple.
+
+    Returns:
+        dict: Sitemap of (post path, last update) entries.
+    """
+    def compute():
+        tz = timezone.get_current_timezone()
+        entries = []
+        last_id, end = chunk * SITEMAP_CHUNK_SIZE - 1, (chunk + 1) * SITEMAP_CHUNK_SIZE
+        while True:
+            rows = list(Post.published.filter(id__gt=last_id, id__lt=end).order_by('id')
+                        .values_list('id', 'slug', 'publish', 'updated')[:SITEMAP_BATCH_SIZE])
+            for post_id, slug, publish, updated in rows:
+                publish = publish.astimezone(tz)
+                path = reverse('blog:post_detail', args=[publish.year, publish.month, publish.day, slug])
+                entries.append((path, updated))
+            if len(rows) < SITEMAP_BATCH_SIZE:
+                return _sitemap(entries)
+            last_id = rows[-1][0]
+
+    return get_or_set(SITEMAP_CHUNK_KEY.format(chunk), compute, None, namespace='sitemap')
+
+
+def page_entries():
+    """
+    Return the cached entries of the post list, category and author pages.
+
+    Only categories and authors with published posts are listed, each page
+    was last modified when its newest post was.
+
+    Returns:
+        dict: Sitemap of (page path, last update) entries.
+    """
+    def compute():
+        entries = []
+        lastmod = Post.published.aggregate(lastmod=Max('updated'))['lastmod']
+        if lastmod is not None:
+            entries.append((reverse('blog:post_list'), lastmod))
+        for name, field in (('blog:post_category', 'category__slug'), ('blog:post_author', 'author__username')):
+            pages = Post.published.values(field).annotate(lastmod=Max('updated')).order_by(field)
+            entries.extend((reverse(name, args=[page[field]]), page['lastmod']) for page in pages)
+        return _sitemap(entries)
+
+    return get_or_set(SITEMAP_PAGES_KEY, compute, None, namespace='sitemap')
+
+
+def _render(request, template_name, sitemap, **context):
+    """
+    Render a sitemap, or answer 304 if the crawler already has this version.
+    """
+    etag = quote_etag(str(sitemap['version']))
+    last_modified = int(sitemap['lastmod'].timestamp()) if sitemap['lastmod'] else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = render(request, template_name,
+                          {'entries': sitemap['entries'],
+                           'base_url': f'{request.scheme}://{request.get_host()}',
+                           **context},
+                          content_type='application/xml')
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def sitemap_index(request):
+    """
+    Render the sitemap index listing the page sitemap and every post chunk.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        HttpResponse: Sitemap index XML.
+    """
+    return _render(request, 'blog/sitemap/index.xml', index_entries(), pages=page_entries())
+
+
+def sitemap_posts(request, chunk):
+    """
+    Render the sitemap of the published posts in one chunk of IDs.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        chunk (int): Chunk number.
+
+    Returns:
+        HttpResponse: Sitemap XML.
+
+    Raises:
+        Http404: If the chunk has no published posts.
+    """
+    # Checked against the index, so unknown chunks never get a cache entry.
+    if chunk not in {number for number, _ in index_entries()['entries']}:
+        raise Http404('No posts in this sitemap')
+    return _render(request, 'blog/sitemap/urlset.xml', chunk_entries(chunk))
+
+
+def sitemap_pages(request):
+    """
+    Render the sitemap of the post list, category and author pages.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        HttpResponse: Sitemap XML.
+    """
+    return _render(request, 'blog/sitemap/urlset.xml', page_entries())
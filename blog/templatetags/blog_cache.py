@@ -0,0 +1,60 @@
+from django import template
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from blog.cache import get_many_or_set, POST_CARD_TIMEOUT
+
+register = template.Library()
+
+CARD_TEMPLATE = 'blog/post/_card.html'
+
+
+def post_card_key(post):
+    """
+    Build the fragment cache key of a post card.
+
+    The key changes whenever the post row is saved or its stored counters
+    move. Renamed authors and categories show up once the card expires.
+
+    Args:
+        post: The post rendered by the card.
+
+    Returns:
+        str: The cache key of the card.
+    """
+    return (f'blog:card:{post.id}:{post.updated.timestamp()}:'
+            f'{post.likes_count}:{post.dislikes_count}:{post.comments_count}')
+
+
+@register.simple_tag
+def post_cards(posts):
+    """
+    Render the cards of a page of posts, reusing cached fragments.
+
+    All card fragments are fetched in one cache round trip and only the
+    missing ones are rendered and stored. Search results with highlighted
+    snippets depend on the query and are always rendered.
+
+    Args:
+        posts: Iterable of posts loaded with PostQuerySet.for_list.
+
+    Returns:
+        str: HTML of all cards.
+    """
+    card_template = get_template(CARD_TEMPLATE)
+
+    def render(post):
+        return lambda: card_template.render({'post': post})
+
+    computations = {}
+    keys = []
+    for post in posts:
+        if hasattr(post, 'snippet'):
+            keys.append(render(post))
+        else:
+            key = post_card_key(post)
+            computations[key] = render(post)
+            keys.append(key)
+
+    cards = get_many_or_set(computations, POST_CARD_TIMEOUT, namespace='post_card')
+    return mark_safe(''.join(key() if callable(key) else cards[key] for key in keys))
@@ -9,6 +9,9 @@ def is_liked_by(instance, user):
     """
     Check if the instance is liked by the specified user.
 
+    Uses the ``liked_by_user`` annotation of ``with_reactions`` when present,
+    so no query is made for objects loaded by the post detail view.
+
     Args:
         instance: The instance to check (e.g., a Post or Comment object).
         user: The user object.
@@ -16,6 +19,8 @@ def is_liked_by(instance, user):
     Returns:
         bool: True if the instance is liked by the user, False otherwise.
     """
+    if hasattr(instance, 'liked_by_user'):
+        return instance.liked_by_user
     if user.is_authenticated:
         return instance.is_liked_by(user)
     return False
@@ -26,6 +31,9 @@ def is_disliked_by(instance, user):
     """
     Check if the instance is disliked by the specified user.
 
+    Uses the ``disliked_by_user`` annotation of ``with_reactions`` when present,
+    so no query is made for objects loaded by the post detail view.
+
     Args:
         instance: The instance to check (e.g., a Post or Comment object).
         user: The user object.
@@ -33,6 +41,8 @@ def is_disliked_by(instance, user):
     Returns:
         bool: True if the instance is disliked by the user, False otherwise.
     """
+    if hasattr(instance, 'disliked_by_user'):
+        return instance.disliked_by_user
     if user.is_authenticated:
         return instance.is_disliked_by(user)
     return False
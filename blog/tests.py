@@ -0,0 +1,956 @@
+import base64
+import io
+import json
+import math
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages, info
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+from core import metrics
+from core.profiling import QueryBudgetExceeded
+from core.routers import PIN_COOKIE, routed_request
+from core.sqlite import retry_on_lock
+
+from . import api, rankings, search
+from .cache import (
+    invalidate_tags,
+    post_tag,
+    set_cached_page,
+    sitemap_chunk,
+    tag_sequence,
+    NAV_ARCHIVE_KEY,
+    NAV_CATEGORIES_KEY,
+    NAV_VERSION_KEY,
+    POST_LIST_TAG,
+    TAG_SEQUENCE_KEY,
+    TAG_VERSION_KEY
+)
+from .models import Category, Comment, CommentVote, Post, PostRanking, PostVote
+from .utils import CursorPaginator, apaginate_objects, date_range, paginate_objects
+from .views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class BlogTestCase(TestCase):
+    """
+    Base test case with an author and a category to create posts in.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = cls.create_user('author')
+        cls.category = Category.objects.create(name='World', slug='world')
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        user = User.objects.create_user(email=f'{username}@example.com',
+                                        username=username,
+                                        first_name=username.title(),
+                                        last_name='Tester',
+                                        password='password')
+        # Users without a profile are redirected to its form.
+        Profile(user=user, gender='female', date_of_birth='1990-01-01', bio='Bio.', info='Info.').save()
+        return user
+
+    @classmethod
+    def create_post(cls, number, **kwargs):
+        return Post.objects.create(**{
+            'title': f'Post {number}',
+            'slug': f'post-{number}',
+            'author': cls.author,
+            'category': cls.category,
+            'body': f'Body of post {number}.',
+            'image_url': 'https://example.com/image.png',
+            'status': 'published',
+            **kwargs,
+        })
+
+
+@override_settings(QUERY_BUDGETS_STRICT=True)
+class ListQueryTests(BlogTestCase):
+    """
+    The post lists run the same queries whatever the number of posts per page, within their budgets.
+    """
+    PAGE_SIZES = (2, 5)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_author = cls.create_user('other')
+        cls.other_category = Category.objects.create(name='Ukraine', slug='ukraine')
+        now = timezone.now()
+        for number in range(12):
+            post = cls.create_post(number,
+                                   author=(cls.author, cls.other_author)[number % 2],
+                                   category=(cls.category, cls.other_category)[number // 2 % 2],
+                                   publish=now - timedelta(hours=number))
+            Comment.objects.create(post=post, author=cls.other_author, body='A comment.')
+            PostVote.objects.toggle(post, cls.author, PostVote.LIKE)
+
+    def assertListQueries(self, url, anonymous, authenticated, data=None):
+        """
+        Assert the number of queries of a list page, for each page size and both kinds of visitors.
+        """
+        self.client.logout()
+        for user, num in ((None, anonymous), (self.author, authenticated)):
+            if user is not None:
+                self.client.force_login(user)
+            for size in self.PAGE_SIZES:
+                with self.subTest(user=user, page_size=size), override_settings(BLOG_POSTS_PER_PAGE=size):
+                    # Cached pages and navigation would hide the queries.
+                    cache.clear()
+                    with self.assertNumQueries(num):
+                        response = self.client.get(url, data)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(len(response.context['posts']), size)
+
+    def test_post_list(self):
+        self.assertListQueries(reverse('blog:post_list'), 5, 8)
+
+    def test_post_category(self):
+        self.assertListQueries(reverse('blog:post_category', args=['world']), 5, 8)
+
+    def test_post_author(self):
+        self.assertListQueries(reverse('blog:post_author', args=['author']), 5, 8)
+
+    def test_search_post(self):
+        url = reverse('blog:search_posts')
+        self.assertListQueries(url, 5, 8, {'search_query': 'post', 'search_param': 'title'})
+        self.assertListQueries(url, 6, 9, {'search_query': 'body', 'search_param': 'post'})
+
+
+class ProfilingTests(BlogTestCase):
+
+    @override_settings(QUERY_BUDGETS={'*': 1}, QUERY_BUDGETS_STRICT=True)
+    def test_strict_budgets_fail_the_request(self):
+        self.create_post(1)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('blog:post_list'))
+
+    def test_times_pages_of_staff_users(self):
+        User.objects.filter(pk=self.author.pk).update(is_staff=True)
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.client.logout()
+        self.assertNotIn('Server-Timing', self.client.get(reverse('blog:post_list')))
+
+
+class PaginationTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        # Two groups of posts with the same publication and creation times.
+        for number in range(7):
+            cls.create_post(number, publish=now - timedelta(days=number // 4))
+        Post.objects.update(created=now)
+        cls.ordered = list(Post.objects.order_by('-publish', '-created', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [post.id for post in page]
+
+    def test_cursors_walk_the_pages_in_both_directions(self):
+        paginator = CursorPaginator(Post.objects.all(), 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([self.ids(page) for page in pages],
+                         [self.ordered[:3], self.ordered[3:6], self.ordered[6:]])
+        self.assertFalse(pages[0].has_previous())
+
+        page = pages[-1]
+        backwards = [self.ids(page)]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backwards.insert(0, self.ids(page))
+            self.assertTrue(page.has_next())
+        self.assertEqual(backwards, [self.ids(page) for page in pages])
+
+    def test_cursors_split_ties_by_id(self):
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        page, seen = paginator.page(), []
+        while True:
+            seen.extend(self.ids(page))
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(seen, self.ordered)
+
+    def test_tampered_cursors_deliver_the_first_page(self):
+        paginator = CursorPaginator(Post.objects.all(), 3)
+        self.assertEqual(self.ids(paginator.page(paginator.page().next_cursor)), self.ordered[3:6])
+        payloads = [{'p': ['not a date', 'not a date', 1], 'r': False},
+                    {'p': [1, 2], 'r': False},
+                    {'p': 'position'}]
+        cursors = [base64.urlsafe_b64encode(json.dumps(payload).encode()).decode() for payload in payloads]
+        for cursor in [*cursors, '%%%', 'bm90IGpzb24']:
+            page = paginator.page(cursor)
+            self.assertEqual(self.ids(page), self.ordered[:3])
+            self.assertFalse(page.has_previous())
+
+    async def test_page_numbers_out_of_range_deliver_the_last_page(self):
+        def paginate(request):
+            page = paginate_objects(request, Post.objects.order_by('id'), 3)
+            return page.number, self.ids(page)
+
+        for number in ('0', '-1', '99', 'x', '2'):
+            request = RequestFactory().get('/', {'page': number})
+            page = await apaginate_objects(request, Post.objects.order_by('id'), 3)
+            self.assertEqual((page.number, self.ids(page)), await sync_to_async(paginate)(request))
+
+
+class MetricsTests(BlogTestCase):
+
+    def test_metrics_implement_samples(self):
+        with self.assertRaises(TypeError):
+            metrics.Metric('incomplete_total', 'Metric without samples.')
+
+    async def test_dumps_values_of_asynchronous_requests(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                self.settings(METRICS_MULTIPROCESS_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+            response = await self.async_client.get(reverse('blog:post_list'))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(list(Path(directory).glob('*.json')))
+            self.assertIn('view="blog:post_list"', metrics.REGISTRY.render())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is only understood on SQLite.')
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class QueryPlanTests(BlogTestCase):
+    """
+    The queries of the blog views read posts through their indexes, never the whole table.
+
+    Every SELECT a view runs is passed to SQLite's EXPLAIN QUERY PLAN.
+    """
+    # Tables that are read whole on purpose, e.g. the navigation menus.
+    ALLOWED_SCANS = {'blog_category', 'accounts_customuser', 'django_session'}
+
+    full_scan = re.compile(r'^SCAN (\w+)$')
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = cls.create_user('reader')
+        now = timezone.now()
+        for number in range(6):
+            post = cls.create_post(number, publish=now - timedelta(days=number))
+            comment = Comment.objects.create(post=post, author=cls.reader, body='A comment.')
+            PostVote.objects.toggle(post, cls.reader, PostVote.LIKE)
+            CommentVote.objects.toggle(comment, cls.author, CommentVote.DISLIKE)
+        cls.post = post
+        cls.create_post(6, status='draft')
+
+    def plans(self, url, data=None):
+        """
+        Request url anonymously and logged in, and return the plans of its SELECT queries.
+        """
+        queries = []
+        for user in (None, self.reader):
+            if user is not None:
+                self.client.force_login(user)
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url, data)
+            self.assertEqual(response.status_code, 200, url)
+            queries += [query['sql'] for query in captured if query['sql'].startswith('SELECT')]
+        self.client.logout()
+
+        plans = []
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[3] for row in cursor.fetchall()]))
+        return plans
+
+    def assertUsesIndexes(self, url, *indexes, data=None):
+        """
+        Assert that the queries of a view scan no table but ALLOWED_SCANS and use every named index.
+        """
+        plans = self.plans(url, data)
+        steps = [step for sql, plan in plans for step in plan]
+        for sql, plan in plans:
+            scans = {match.group(1) for match in map(self.full_scan.match, plan) if match}
+            self.assertLessEqual(scans, self.ALLOWED_SCANS, f'{url}\n{sql}\n' + '\n'.join(plan))
+        for index in indexes:
+            self.assertTrue(any(f'INDEX {index}' in step for step in steps),
+                            f'{url} does not use {index}:\n' + '\n'.join(steps))
+
+    def test_post_lists(self):
+        next_page = CursorPaginator(Post.published.all(), 2).encode_cursor(self.post)
+        self.assertUsesIndexes(reverse('blog:post_list'), 'blog_post_published_idx')
+        self.assertUsesIndexes(reverse('blog:post_list'), 'blog_post_published_idx', data={'cursor': next_page})
+        self.assertUsesIndexes(reverse('blog:post_category', args=['world']), 'blog_post_category_pub_idx')
+        self.assertUsesIndexes(reverse('blog:post_author', args=['author']), 'blog_post_author_pub_idx')
+
+    def test_post_period(self):
+        self.assertUsesIndexes(reverse('blog:post_period', args=['week']), 'blog_post_published_idx')
+
+    def test_post_archive(self):
+        publish = timezone.localtime(self.post.publish)
+        self.assertUsesIndexes(reverse('blog:post_archive', args=[publish.year, publish.month]),
+                               'blog_post_published_idx')
+
+    def test_search_post(self):
+        url = reverse('blog:search_posts')
+        publish = timezone.localtime(self.post.publish)
+        self.assertUsesIndexes(url, 'blog_post_published_idx',
+                               data={'search_query': 'post', 'search_param': 'title'})
+        self.assertUsesIndexes(url, 'blog_post_published_idx',
+                               data={'search_query': 'author', 'search_param': 'author'})
+        self.assertUsesIndexes(url, data={'search_query': 'body', 'search_param': 'post'})
+        self.assertUsesIndexes(url, 'blog_post_published_idx',
+                               data={'search_query': f'{publish:%Y-%m-%d}', 'search_param': 'publish'})
+
+    def test_post_detail(self):
+        self.assertUsesIndexes(self.post.get_absolute_url(),
+                               'blog_post_slug_publish_idx', 'blog_comment_post_recent_idx')
+        self.assertUsesIndexes(reverse('blog:post_comments', args=[self.post.id]), 'blog_comment_post_recent_idx')
+
+    def test_rankings(self):
+        self.assertUsesIndexes(reverse('blog:post_trending'), 'blog_rank_trending_idx')
+        self.assertUsesIndexes(reverse('blog:post_discussed_category', args=['world']),
+                               'blog_rank_cat_discussion_idx')
+
+    def test_api(self):
+        self.assertUsesIndexes(reverse('api_v1:post_list'), 'blog_post_published_idx')
+        self.assertUsesIndexes(reverse('api_v1:post_detail', args=[self.post.id]))
+        self.assertUsesIndexes(reverse('api_v1:post_comments', args=[self.post.id]), 'blog_comment_post_recent_idx')
+        self.assertUsesIndexes(reverse('api_v1:author_list'))
+
+    def test_sitemaps(self):
+        self.assertUsesIndexes(reverse('blog:sitemap'))
+        self.assertUsesIndexes(reverse('blog:sitemap_pages'))
+        self.assertUsesIndexes(reverse('blog:sitemap_posts', args=[sitemap_chunk(self.post.id)]))
+
+
+class ExportTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author.is_staff = True
+        cls.author.save(update_fields=['is_staff'])
+        for number in range(3):
+            cls.create_post(number)
+
+    def export(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('blog:export_data', args=['posts']), {'format': 'csv'})
+        self.assertFalse(response.is_async)
+        return b''.join(response.streaming_content)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.author)
+        response = await self.async_client.get(reverse('blog:export_data', args=['posts']), {'format': 'csv'})
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 4)
+        self.assertEqual(content, await sync_to_async(self.export)())
+
+    def test_command_writes_to_its_stdout(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('export_blog', 'posts', stdout=stdout, stderr=stderr)
+        self.assertEqual([json.loads(line)['title'] for line in stdout.getvalue().splitlines()],
+                         ['Post 0', 'Post 1', 'Post 2'])
+        self.assertIn('Exported 3 posts rows', stderr.getvalue())
+
+
+class CounterTests(BlogTestCase):
+
+    def create_reactions(self, post, user):
+        comment = Comment.objects.create(post=post, author=user, body='Comment.')
+        PostVote.objects.create(post=post, user=user, value=PostVote.LIKE)
+        CommentVote.objects.create(comment=comment, user=user, value=CommentVote.DISLIKE)
+        return comment
+
+    def test_counts_deleted_rows(self):
+        post = self.create_post(1)
+        comment = self.create_reactions(post, self.create_user('reader'))
+        comment.votes.get().delete()
+        comment.refresh_from_db()
+        self.assertEqual(comment.dislikes_count, 0)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual((post.likes_count, post.comments_count), (1, 0))
+
+    def test_counts_rows_of_deleted_users(self):
+        post = self.create_post(1)
+        reader = self.create_user('reader')
+        self.create_reactions(post, reader)
+        reader.delete()
+        post.refresh_from_db()
+        self.assertEqual((post.likes_count, post.comments_count), (0, 0))
+
+    def test_skips_the_counters_of_deleted_posts(self):
+        post = self.create_post(1)
+        for number in range(3):
+            self.create_reactions(post, self.create_user(f'reader{number}'))
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertFalse([sql for sql in updates if re.search(r'_count"? = ', sql)])
+
+
+class VoteMigrationTests(TransactionTestCase):
+    """
+    Migration of the like and dislike tables into the signed vote tables.
+    """
+    before = [('blog', '0003_reaction_counters')]
+    after = [('blog', '0004_unified_votes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_copies_votes_and_keeps_the_like_of_conflicting_reactions(self):
+        apps = self.migrate(self.before)
+        reacted = timezone.now() - timedelta(days=30)
+        user, other = (User.objects.create_user(email=f'{name}@example.com', username=name, first_name=name,
+                                                last_name='Tester', password='password')
+                       for name in ('reader', 'other'))
+        category = apps.get_model('blog', 'Category').objects.create(name='World', slug='world')
+        post = apps.get_model('blog', 'Post').objects.create(
+            title='Post', slug='post', author_id=user.pk, category=category, body='Body.',
+            image_url='https://example.com/image.png', status='published')
+        apps.get_model('blog', 'PostLike').objects.create(post=post, user_id=user.pk)
+        apps.get_model('blog', 'PostDislike').objects.create(post=post, user_id=user.pk)
+        apps.get_model('blog', 'PostDislike').objects.create(post=post, user_id=other.pk)
+        for name in ('PostLike', 'PostDislike'):
+            apps.get_model('blog', name).objects.update(created=reacted)
+        apps.get_model('blog', 'Post').objects.update(likes_count=1, dislikes_count=2)
+
+        apps = self.migrate(self.after)
+        votes = apps.get_model('blog', 'PostVote').objects.order_by('value')
+        self.assertEqual(list(votes.values_list('user_id', 'value', 'created', 'updated')),
+                         [(other.pk, -1, reacted, reacted), (user.pk, 1, reacted, reacted)])
+        post = apps.get_model('blog', 'Post').objects.get()
+        self.assertEqual((post.likes_count, post.dislikes_count), (1, 1))
+
+        apps = self.migrate(self.before)
+        for name, user_id in (('PostLike', user.pk), ('PostDislike', other.pk)):
+            self.assertEqual(list(apps.get_model('blog', name).objects.values_list('user_id', 'created')),
+                             [(user_id, reacted)])
+
+
+class ImportTests(BlogTestCase):
+
+    def import_posts(self, *records):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as file:
+            file.writelines(json.dumps(record) + '\n' for record in records)
+        self.addCleanup(os.remove, file.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_blog', file.name, batch_size=2, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_imports_posts_with_unique_slugs(self):
+        publish = timezone.now().replace(hour=12)
+        self.create_post(1, title='Imported title', slug='imported-title', publish=publish)
+        record = {'title': 'Imported title', 'body': 'Searchable body.', 'author': 'author',
+                  'category': 'world', 'publish': publish.isoformat()}
+        stdout, stderr = self.import_posts(record, record, {**record, 'author': 'nobody'}, record)
+        self.assertIn('Imported 3 post records, skipped 1', stdout)
+        self.assertIn("line 3: unknown author 'nobody'", stderr)
+
+        posts = Post.objects.filter(title='Imported title').order_by('id')
+        self.assertEqual([post.slug for post in posts],
+                         ['imported-title', 'imported-title-2', 'imported-title-3', 'imported-title-4'])
+        scores = list(PostRanking.objects.filter(post__in=posts).order_by('post').values_list('trending', flat=True))
+        rankings.rebuild_rankings()
+        self.assertEqual(scores, list(PostRanking.objects.filter(post__in=posts)
+                                      .order_by('post').values_list('trending', flat=True)))
+        imported = [post.pk for post in posts[1:]]
+        self.assertEqual(sorted(post.pk for post in search.FullTextResults('searchable')[:10]), imported)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'The full-text index is an SQLite FTS5 table.')
+class SearchIndexTests(BlogTestCase):
+
+    def test_rebuilding_checks_the_table_again(self):
+        self.create_post(1)
+        self.assertTrue(search.fts_available())
+        # As checked before the table was created.
+        connection.blog_fts_checked = (connection.connection, False)
+        self.assertFalse(search.fts_available())
+        self.assertEqual(search.rebuild_index(), 1)
+        self.assertTrue(search.fts_available())
+
+    def test_new_connections_check_the_table_again(self):
+        connection.blog_fts_checked = (object(), False)
+        self.assertTrue(search.fts_available())
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(BlogTestCase):
+    """
+    Reads stay on the primary within test transactions, the replica alias is never connected to.
+    """
+
+    def test_pins_clients_after_a_write(self):
+        post = self.create_post(1)
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        response = self.client.post(reverse('blog:post_like_json', args=[post.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_write_routing_alone_does_not_pin(self):
+        with routed_request() as state:
+            Category.objects.get_or_create(slug='world', defaults={'name': 'World'})
+            self.assertFalse(state.wrote)
+            Category.objects.get_or_create(slug='ukraine', defaults={'name': 'Ukraine'})
+            self.assertTrue(state.wrote and state.pinned)
+
+
+class ConditionalTests(BlogTestCase):
+
+    def test_deleted_votes_change_the_etag(self):
+        post = self.create_post(1)
+        vote = PostVote.objects.create(post=post, user=self.author, value=PostVote.LIKE)
+        etags = {}
+        for url in (post.get_absolute_url(), reverse('blog:post_list')):
+            response = self.client.get(url)
+            self.assertNotIn('Last-Modified', response)
+            etags[url] = response['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vote.delete()
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag,
+                                       HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+            self.assertEqual(response.status_code, 200)
+
+
+class PageCacheTests(BlogTestCase):
+
+    def test_invalidates_after_commit(self):
+        post = self.create_post(1)
+        key = TAG_VERSION_KEY.format(post_tag(post.pk))
+        cache.set(key, 1, None)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                post.save()
+            self.assertEqual(cache.get(key), 1)
+        self.assertNotEqual(cache.get(key), 1)
+
+    def test_skips_pages_invalidated_while_rendering(self):
+        request = RequestFactory().get('/')
+        started = tag_sequence()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tags(POST_LIST_TAG)
+        self.assertFalse(set_cached_page(request, HttpResponse('Old rows'), [POST_LIST_TAG], started))
+        self.assertTrue(set_cached_page(request, HttpResponse('New rows'), [POST_LIST_TAG], tag_sequence()))
+
+    def test_tag_versions_survive_a_lost_sequence(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_tags(POST_LIST_TAG)
+        version = cache.get(TAG_VERSION_KEY.format(POST_LIST_TAG))
+        cache.delete(TAG_SEQUENCE_KEY)
+        self.assertGreater(tag_sequence(), version)
+
+
+@override_settings(SQLITE_LOCK_RETRIES=2)
+class LockRetryTests(TransactionTestCase):
+
+    def request(self, method):
+        request = getattr(RequestFactory(), method)('/')
+        request._messages = CookieStorage(request)
+        return request
+
+    def test_retries_only_the_given_methods_in_a_transaction(self):
+        @retry_on_lock(methods=('POST',))
+        def view(request):
+            return HttpResponse(transaction.get_connection().in_atomic_block)
+
+        self.assertEqual(view(self.request('get')).content, b'False')
+        self.assertEqual(view(self.request('post')).content, b'True')
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite transaction modes')
+    def test_begins_immediate_transactions_for_writes_only(self):
+        @retry_on_lock(methods=('POST',))
+        def view(request):
+            return HttpResponse()
+
+        with CaptureQueriesContext(connection) as queries:
+            view(self.request('post'))
+            view(self.request('get'))
+            with transaction.atomic():
+                Post.objects.exists()
+        self.assertEqual([query['sql'] for query in queries if query['sql'].startswith('BEGIN')],
+                         ['BEGIN IMMEDIATE', 'BEGIN'])
+
+    def test_drops_the_messages_of_failed_attempts(self):
+        attempts = []
+
+        @retry_on_lock
+        def view(request):
+            info(request, f'Attempt {len(attempts)}')
+            attempts.append(request)
+            if len(attempts) < 3:
+                raise OperationalError('database is locked')
+            return HttpResponse()
+
+        request = self.request('get')
+        info(request, 'Queued before')
+        view(request)
+        self.assertEqual([str(message) for message in get_messages(request)], ['Queued before', 'Attempt 2'])
+
+
+class RankingTests(BlogTestCase):
+
+    def scores(self, post):
+        return PostRanking.objects.values_list('trending', 'discussion').get(post=post)
+
+    def test_add_matches_the_sums(self):
+        score, total = 0.0, 0.0
+        for sign, exponent in [(1, 3.0), (1, -2.5), (-1, 4.0), (-1, 0.5), (1, 10.0), (-1, 10.0)]:
+            score = rankings.add(score, sign, exponent)
+            total += sign * 2 ** exponent
+            self.assertAlmostEqual(score, math.copysign(math.log2(1 + abs(total)), total))
+
+    def test_scores_events_long_after_the_epoch(self):
+        # 2 ** (hours / 48) overflows a float about six years after the epoch.
+        moment = settings.BLOG_RANKING_EPOCH + timedelta(days=365 * 50)
+        old = self.create_post(1, publish=moment - timedelta(days=30))
+        new = self.create_post(2, publish=moment)
+        published = self.scores(new)
+
+        rankings.record(new.pk, [('comment', moment, 1), ('like', moment, 1), ('dislike', moment, 1)])
+        trending, discussion = self.scores(new)
+        self.assertTrue(math.isfinite(trending) and math.isfinite(discussion))
+        self.assertAlmostEqual(trending, published[0] + math.log2(3.5), places=6)
+        self.assertEqual(rankings.top_posts('trending'), [new, old])
+
+        rankings.rebuild_rankings()
+        self.assertAlmostEqual(self.scores(new)[0], published[0], places=6)
+
+    def test_taken_back_events_cancel_out(self):
+        moment = settings.BLOG_RANKING_EPOCH + timedelta(days=365 * 50)
+        post = self.create_post(1, publish=moment)
+        published = self.scores(post)
+        events = [('dislike', moment + timedelta(days=7), 1), ('comment', moment, 1)]
+        rankings.record(post.pk, events)
+        self.assertLess(self.scores(post)[0], 0)
+
+        rankings.record(post.pk, [(event, when, -sign) for event, when, sign in events])
+        for score, expected in zip(self.scores(post), published):
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_toggled_votes_cancel_out(self):
+        post = self.create_post(1)
+        published = self.scores(post)
+        PostVote.objects.toggle(post, self.author, PostVote.LIKE)
+        PostVote.objects.toggle(post, self.author, PostVote.DISLIKE)
+        PostVote.objects.toggle(post, self.author, PostVote.DISLIKE)
+        for score, expected in zip(self.scores(post), published):
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_saving_a_post_does_not_read_its_reactions(self):
+        post = self.create_post(1)
+        Comment.objects.create(post=post, author=self.author, body='Comment.')
+        PostVote.objects.create(post=post, user=self.author, value=PostVote.LIKE)
+        scores = self.scores(post)
+
+        post = Post.objects.get(pk=post.pk)
+        post.title = 'Renamed'
+        post.status = 'draft'
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        self.assertFalse([query for query in queries if re.search(r'blog_(postvote|comment)\b', query['sql'])])
+        self.assertEqual(self.scores(post), scores)
+        self.assertFalse(PostRanking.objects.get(post=post).is_published)
+
+    def test_moved_publication_is_rescored(self):
+        post = self.create_post(1)
+        Comment.objects.create(post=post, author=self.author, body='Comment.')
+
+        post = Post.objects.get(pk=post.pk)
+        post.publish += timedelta(days=3)
+        post.save()
+        post.publish -= timedelta(days=1)
+        post.save()
+        scores = self.scores(post)
+        rankings.rebuild_rankings()
+        for score, expected in zip(scores, self.scores(post)):
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_skips_the_rankings_of_deleted_posts(self):
+        post = self.create_post(1)
+        for number in range(3):
+            reader = self.create_user(f'reader{number}')
+            Comment.objects.create(post=post, author=reader, body='Comment.')
+            PostVote.objects.create(post=post, user=reader, value=PostVote.LIKE)
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        self.assertFalse([query for query in queries
+                          if 'blog_postranking' in query['sql'] and not query['sql'].startswith('DELETE')])
+
+
+class VoteJsonTests(BlogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.post = self.create_post(1)
+        self.client.force_login(self.author)
+
+    def vote(self, name, object_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse(name, args=[object_id]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_toggles_and_switches_post_votes(self):
+        self.assertEqual(self.vote('blog:post_like_json', self.post.pk),
+                         {'likes': 1, 'dislikes': 0, 'liked': True, 'disliked': False})
+        self.assertEqual(self.vote('blog:post_dislike_json', self.post.pk),
+                         {'likes': 0, 'dislikes': 1, 'liked': False, 'disliked': True})
+        self.assertEqual(self.vote('blog:post_dislike_json', self.post.pk),
+                         {'likes': 0, 'dislikes': 0, 'liked': False, 'disliked': False})
+
+    def test_toggles_comment_votes(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, body='A comment.')
+        self.assertEqual(self.vote('blog:comment_like_json', comment.pk),
+                         {'likes': 1, 'dislikes': 0, 'liked': True, 'disliked': False})
+        self.assertEqual(self.vote('blog:comment_like_json', comment.pk),
+                         {'likes': 0, 'dislikes': 0, 'liked': False, 'disliked': False})
+
+    def test_rejects_anonymous_users_and_gets(self):
+        url = reverse('blog:post_like_json', args=[self.post.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.logout()
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Authentication required'})
+        self.assertFalse(PostVote.objects.exists())
+
+
+class NavigationCacheTests(BlogTestCase):
+    """
+    Navigation fragments stay cached until a signal bumps the navigation version.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # Logged in pages skip the page cache, only the fragment cache is left.
+        self.client.force_login(self.author)
+
+    def test_category_changes_rerender_the_fragments(self):
+        url = reverse('blog:post_list')
+        self.assertContains(self.client.get(url), 'World')
+        # Bulk updates send no signal, the cached fragment is kept.
+        Category.objects.filter(pk=self.category.pk).update(name='Europe')
+        self.assertNotContains(self.client.get(url), 'Europe')
+
+        version = cache.get(NAV_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='Ukraine', slug='ukraine')
+        self.assertNotEqual(cache.get(NAV_VERSION_KEY), version)
+        self.assertIsNone(cache.get(NAV_CATEGORIES_KEY))
+        response = self.client.get(url)
+        self.assertContains(response, 'Europe')
+        self.assertContains(response, 'Ukraine')
+
+    def test_post_changes_keep_the_category_list(self):
+        self.client.get(reverse('blog:post_list'))
+        categories = cache.get(NAV_CATEGORIES_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post(1)
+        self.assertEqual(cache.get(NAV_CATEGORIES_KEY), categories)
+        self.assertIsNone(cache.get(NAV_ARCHIVE_KEY))
+        self.assertContains(self.client.get(reverse('blog:post_list')), 'Post 1')
+
+
+class CommentPageTests(BlogTestCase):
+
+    def test_load_more_link_leads_to_the_remaining_comments(self):
+        post = self.create_post(1)
+        bodies = [f'Comment {number:02}' for number in range(COMMENTS_PER_PAGE + 3)]
+        for body in bodies:
+            Comment.objects.create(post=post, author=self.author, body=body)
+        # The newest comments come first, ties on the timestamps are broken by ID.
+        newest = bodies[::-1]
+
+        response = self.client.get(post.get_absolute_url())
+        for body in newest[:COMMENTS_PER_PAGE]:
+            self.assertContains(response, f'<p>{body}</p>')
+        for body in newest[COMMENTS_PER_PAGE:]:
+            self.assertNotContains(response, f'<p>{body}</p>')
+
+        url = re.search(r'data-comments-url="([^"]+)"', response.content.decode()).group(1)
+        response = self.client.get(url.replace('&amp;', '&'))
+        self.assertEqual(response.status_code, 200)
+        for body in newest[COMMENTS_PER_PAGE:]:
+            self.assertContains(response, f'<p>{body}</p>')
+        for body in newest[:COMMENTS_PER_PAGE]:
+            self.assertNotContains(response, f'<p>{body}</p>')
+        self.assertNotContains(response, 'Load more comments')
+
+
+class DateRangeTests(BlogTestCase):
+    """
+    Publication dates are matched in the current time zone, not in UTC.
+    """
+
+    @staticmethod
+    def local(*args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_bounds_are_local_midnights(self):
+        self.assertEqual(date_range(2023), (self.local(2023, 1, 1), self.local(2024, 1, 1)))
+        self.assertEqual(date_range(2023, 12), (self.local(2023, 12, 1), self.local(2024, 1, 1)))
+        self.assertEqual(date_range(2024, 2, 29), (self.local(2024, 2, 29), self.local(2024, 3, 1)))
+        with self.assertRaises(ValueError):
+            date_range(2023, 2, 29)
+
+    def test_posts_after_local_midnight_belong_to_the_next_month(self):
+        # Both are published on January 31 in UTC.
+        january = self.create_post(1, publish=self.local(2024, 1, 31, 23, 30))
+        february = self.create_post(2, publish=self.local(2024, 2, 1, 0, 30))
+
+        response = self.client.get(reverse('blog:post_archive', args=[2024, 1]))
+        self.assertContains(response, january.title)
+        self.assertNotContains(response, february.title)
+        response = self.client.get(reverse('blog:post_archive', args=[2024, 2]))
+        self.assertContains(response, february.title)
+        self.assertNotContains(response, january.title)
+
+        self.assertEqual(february.get_absolute_url(), reverse('blog:post_detail', args=[2024, 2, 1, 'post-2']))
+        self.assertEqual(self.client.get(february.get_absolute_url()).status_code, 200)
+        self.assertEqual(self.client.get(reverse('blog:post_detail', args=[2024, 1, 31, 'post-2'])).status_code,
+                         404)
+
+
+class FeedTests(BlogTestCase):
+
+    def test_lists_the_published_posts_of_each_feed(self):
+        other_category = Category.objects.create(name='Ukraine', slug='ukraine')
+        world = self.create_post(1)
+        ukraine = self.create_post(2, category=other_category)
+        self.create_post(3, status='draft')
+
+        response = self.client.get(reverse('blog:feed_rss'))
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        for post in (world, ukraine):
+            self.assertContains(response, f'<title>{post.title}</title>')
+            self.assertContains(response, f'<link>http://testserver{post.get_absolute_url()}</link>')
+        self.assertNotContains(response, 'Post 3')
+
+        response = self.client.get(reverse('blog:category_feed_atom', args=['ukraine']))
+        self.assertEqual(response['Content-Type'], 'application/atom+xml; charset=utf-8')
+        self.assertContains(response, '<title>Blog: Ukraine</title>')
+        self.assertContains(response, f'href="http://testserver{ukraine.get_absolute_url()}"')
+        self.assertNotContains(response, world.title)
+
+        self.assertContains(self.client.get(reverse('blog:author_feed_rss', args=['author'])), world.title)
+        self.assertEqual(self.client.get(reverse('blog:category_feed_rss', args=['missing'])).status_code, 404)
+
+    def test_new_posts_invalidate_the_cached_feed(self):
+        self.create_post(1)
+        url = reverse('blog:feed_atom')
+        self.assertNotContains(self.client.get(url), 'Post 2')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post(2)
+        self.assertContains(self.client.get(url), 'Post 2')
+
+
+class SitemapTests(BlogTestCase):
+
+    def test_index_lists_the_chunks_of_published_posts(self):
+        post = self.create_post(1)
+        self.create_post(2, status='draft')
+        chunk = sitemap_chunk(post.pk)
+
+        response = self.client.get(reverse('blog:sitemap'))
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        self.assertContains(response, f'<loc>http://testserver{reverse("blog:sitemap_pages")}</loc>')
+        self.assertContains(response, f'<loc>http://testserver{reverse("blog:sitemap_posts", args=[chunk])}</loc>')
+        self.assertEqual(self.client.get(reverse('blog:sitemap'), HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         304)
+
+        response = self.client.get(reverse('blog:sitemap_posts', args=[chunk]))
+        self.assertContains(response, f'<loc>http://testserver{post.get_absolute_url()}</loc>')
+        self.assertNotContains(response, 'post-2')
+        self.assertEqual(self.client.get(reverse('blog:sitemap_posts', args=[chunk + 1])).status_code, 404)
+
+        response = self.client.get(reverse('blog:sitemap_pages'))
+        self.assertContains(response, f'<loc>http://testserver{reverse("blog:post_category", args=["world"])}</loc>')
+        self.assertContains(response, f'<loc>http://testserver{reverse("blog:post_author", args=["author"])}</loc>')
+
+    def test_saved_posts_invalidate_their_chunk(self):
+        post = self.create_post(1)
+        url = reverse('blog:sitemap_posts', args=[sitemap_chunk(post.pk)])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.slug = 'renamed'
+            post.save()
+        self.assertContains(self.client.get(url), post.get_absolute_url())
+
+
+class ApiTests(BlogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        now = timezone.now()
+        cls.posts = [cls.create_post(number, publish=now - timedelta(hours=number))
+                     for number in range(api.PAGE_SIZE + 1)]
+
+    def test_lists_the_default_fields(self):
+        response = self.client.get(reverse('api_v1:post_list'))
+        self.assertEqual(response.status_code, 200)
+        first = response.json()['results'][0]
+        self.assertEqual(tuple(first), api.POST_LIST_DEFAULT)
+        post = self.posts[0]
+        self.assertEqual((first['id'], first['url'], first['author'], first['category']),
+                         (post.pk, post.get_absolute_url(), 'author', 'world'))
+
+    def test_selects_the_requested_fields(self):
+        response = self.client.get(reverse('api_v1:post_detail', args=[self.posts[0].pk]), {'fields': 'title,id'})
+        self.assertEqual(response.json(), {'title': 'Post 0', 'id': self.posts[0].pk})
+
+        response = self.client.get(reverse('api_v1:post_list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Unknown fields: password', response.json()['error'])
+
+    def test_pages_link_to_each_other(self):
+        response = self.client.get(reverse('api_v1:post_list'), {'fields': 'id'})
+        data = response.json()
+        self.assertEqual([row['id'] for row in data['results']], [post.pk for post in self.posts[:api.PAGE_SIZE]])
+        self.assertIsNone(data['previous'])
+        self.assertIn('fields=id', data['next'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['results'], [{'id': self.posts[-1].pk}])
+        self.assertIsNone(data['next'])
+        data = self.client.get(data['previous']).json()
+        self.assertEqual(len(data['results']), api.PAGE_SIZE)
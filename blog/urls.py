@@ -1,12 +1,32 @@
+from django.conf import settings
 from django.urls import path
+from . import feeds, sitemaps
 from .views import *
 
+if settings.BLOG_ASYNC_VIEWS:
+    from .async_views import post_list, post_category, post_author, post_detail, search_post
+
 app_name = 'blog'
 
 urlpatterns = [
     path('', post_list, name='post_list'),
     path('category/<slug:category>', post_category, name='post_category'),
     path('author/<slug:author>', post_author, name='post_author'),
+    path('period/<slug:period>/', post_period, name='post_period'),
+    path('archive/<int:year>/<int:month>/', post_archive, name='post_archive'),
+    path('trending/', post_trending, name='post_trending'),
+    path('trending/<slug:category>/', post_trending, name='post_trending_category'),
+    path('discussed/', post_discussed, name='post_discussed'),
+    path('discussed/<slug:category>/', post_discussed, name='post_discussed_category'),
+    path('feeds/rss/', feeds.posts_rss, name='feed_rss'),
+    path('feeds/atom/', feeds.posts_atom, name='feed_atom'),
+    path('feeds/category/<slug:category>/rss/', feeds.category_rss, name='category_feed_rss'),
+    path('feeds/category/<slug:category>/atom/', feeds.category_atom, name='category_feed_atom'),
+    path('feeds/author/<slug:author>/rss/', feeds.author_rss, name='author_feed_rss'),
+    path('feeds/author/<slug:author>/atom/', feeds.author_atom, name='author_feed_atom'),
+    path('sitemap.xml', sitemaps.sitemap_index, name='sitemap'),
+    path('sitemap-pages.xml', sitemaps.sitemap_pages, name='sitemap_pages'),
+    path('sitemap-posts-<int:chunk>.xml', sitemaps.sitemap_posts, name='sitemap_posts'),
     path('search/', search_post, name='search_posts'),
     path('<int:year>/<int:month>/<int:day>/<slug:post_slug>/', post_detail, name='post_detail'),
     path('post/create/', add_post, name='add_post'),
@@ -14,9 +34,15 @@ urlpatterns = [
     path('post/<int:post_id>/delete/', delete_post, name='delete_post'),
     path('post/<int:post_id>/like/', like_post, name='post_like'),
     path('post/<int:post_id>/dislike/', dislike_post, name='post_dislike'),
+    path('post/<int:post_id>/like/json/', like_post_json, name='post_like_json'),
+    path('post/<int:post_id>/dislike/json/', dislike_post_json, name='post_dislike_json'),
+    path('post/<int:post_id>/comments/', post_comments, name='post_comments'),
     path('post/<int:post_id>/add_comment/', add_comment, name='add_comment'),
     path('comment/<int:comment_id>/like/', like_comment, name='comment_like'),
     path('comment/<int:comment_id>/dislike/', dislike_comment, name='comment_dislike'),
+    path('comment/<int:comment_id>/like/json/', like_comment_json, name='comment_like_json'),
+    path('comment/<int:comment_id>/dislike/json/', dislike_comment_json, name='comment_dislike_json'),
+    path('export/<slug:kind>/', export_data, name='export_data'),
     path('delete-comment/<int:comment_id>/', delete_comment, name='delete_comment'),
     path('toggle_comment_active/<int:comment_id>/', toggle_comment_active, name='toggle_comment_active')
 ]
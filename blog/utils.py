@@ -1,4 +1,28 @@
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+import asyncio
+import base64
+import binascii
+import json
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+DEFAULT_POSTS_PER_PAGE = 2
+
+
+def posts_per_page():
+    """
+    Return the page size of the post lists.
+
+    :return: The BLOG_POSTS_PER_PAGE setting (default is 2).
+    :rtype: int
+    """
+    return getattr(settings, 'BLOG_POSTS_PER_PAGE', DEFAULT_POSTS_PER_PAGE)
+
 
 def paginate_objects(request, objects_list, num_per_page=2):
     """
@@ -26,3 +50,296 @@ def paginate_objects(request, objects_list, num_per_page=2):
         objects = paginator.page(paginator.num_pages)
 
     return objects
+
+
+def date_range(year, month=None, day=None):
+    """
+    Return the half-open datetime range of a year, month or day.
+
+    The bounds are midnights in the current time zone, so the range can be
+    compared with stored datetimes directly and an index on them is used,
+    unlike the __year, __month and __day lookups.
+
+    :param year: The year.
+    :type year: int
+    :param month: The month, the whole year if omitted.
+    :type month: int
+    :param day: The day, the whole month if omitted.
+    :type day: int
+    :return: Start (inclusive) and end (exclusive) of the period.
+    :rtype: tuple
+    :raises ValueError: If the date does not exist.
+    """
+    year = int(year)
+    if month is None:
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    elif day is None:
+        start = date(year, int(month), 1)
+        end = date(year + 1, 1, 1) if start.month == 12 else date(year, start.month + 1, 1)
+    else:
+        start = date(year, int(month), int(day))
+        end = start + timedelta(days=1)
+    return _midnight(start), _midnight(end)
+
+
+def recent_days_range(days):
+    """
+    Return the half-open datetime range of the last days, today included.
+
+    :param days: Number of calendar days, 1 means today only.
+    :type days: int
+    :return: Start (inclusive) and end (exclusive) of the period.
+    :rtype: tuple
+    """
+    today = timezone.localdate()
+    return _midnight(today - timedelta(days=days - 1)), _midnight(today + timedelta(days=1))
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def paginate_cursor(request, objects_list, num_per_page=2, ordering=None):
+    """
+    Paginate a queryset with opaque cursor tokens instead of page numbers.
+
+    Unlike paginate_objects, no COUNT query is run and deep pages cost the
+    same as the first one, because each page starts from the position of the
+    last row seen rather than from an OFFSET.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param objects_list: The queryset to paginate.
+    :type objects_list: django.db.models.QuerySet
+    :param num_per_page: The number of objects per page (default is 2).
+    :type num_per_page: int
+    :param ordering: Ordering used as the keyset (default is the model ordering plus -id).
+    :type ordering: tuple
+    :return: Paginated objects.
+    :rtype: CursorPage
+    """
+    paginator = CursorPaginator(objects_list, num_per_page, ordering)
+    return paginator.page(request.GET.get(paginator.cursor_param), request.GET)
+
+
+async def apaginate_cursor(request, objects_list, num_per_page=2, ordering=None):
+    """
+    Asynchronous version of paginate_cursor, the page is read with the async ORM.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param objects_list: The queryset to paginate.
+    :type objects_list: django.db.models.QuerySet
+    :param num_per_page: The number of objects per page (default is 2).
+    :type num_per_page: int
+    :param ordering: Ordering used as the keyset (default is the model ordering plus -id).
+    :type ordering: tuple
+    :return: Paginated objects.
+    :rtype: CursorPage
+    """
+    paginator = CursorPaginator(objects_list, num_per_page, ordering)
+    return await paginator.apage(request.GET.get(paginator.cursor_param), request.GET)
+
+
+async def apaginate_objects(request, objects_list, num_per_page=2):
+    """
+    Asynchronous version of paginate_objects for querysets.
+
+    The count and the requested page are queried concurrently; only a page
+    number out of range needs a second round trip. Like paginate_objects,
+    it then delivers the last page.
+
+    :param request: The HTTP request object.
+    :type request: HttpRequest
+    :param objects_list: The queryset to paginate.
+    :type objects_list: django.db.models.QuerySet
+    :param num_per_page: The number of objects per page (default is 2).
+    :type num_per_page: int
+    :return: Paginated objects.
+    :rtype: django.core.paginator.Page
+    """
+    paginator = Paginator(objects_list, num_per_page)
+    try:
+        number = int(request.GET.get('page', 1))
+    except (TypeError, ValueError):
+        number = 1
+
+    async def read(number):
+        start = (number - 1) * paginator.per_page
+        return [obj async for obj in objects_list[start:start + paginator.per_page]]
+
+    count, object_list = await asyncio.gather(objects_list.acount(), read(max(number, 1)))
+    # Paginator.count is a cached property, the counted value is reused.
+    paginator.count = count
+    if not 1 <= number <= paginator.num_pages:
+        number = paginator.num_pages
+        object_list = await read(number)
+    return Page(object_list, number, paginator)
+
+
+class CursorPage:
+    """
+    A single page produced by CursorPaginator.
+
+    Attributes:
+        object_list (list): Objects on this page.
+        next_cursor (str): Token of the following page or None.
+        previous_cursor (str): Token of the preceding page or None.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, params, cursor_param):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.params = params
+        self.cursor_param = cursor_param
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _query(self, cursor):
+        params = self.params.copy()
+        params[self.cursor_param] = cursor
+        params.pop('page', None)
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        """
+        Query string leading to the next page, other GET parameters preserved.
+        """
+        return self._query(self.next_cursor)
+
+    @property
+    def previous_query(self):
+        """
+        Query string leading to the previous page, other GET parameters preserved.
+        """
+        return self._query(self.previous_cursor)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator over an ordered queryset.
+
+    The ordering must be unique, so it should end with the primary key.
+    Cursors encode the ordering values of the boundary row and the direction
+    in which the next page is read.
+    """
+    cursor_param = 'cursor'
+
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        if ordering is None:
+            ordering = tuple(queryset.model._meta.ordering) + ('-id',)
+        self.ordering = tuple(ordering)
+
+    @staticmethod
+    def _field_name(order):
+        return order.lstrip('-')
+
+    def _position(self, obj):
+        values = []
+        for order in self.ordering:
+            name = self._field_name(order)
+            value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def encode_cursor(self, obj, reverse=False):
+        """
+        Build a token pointing past obj, reading backwards when reverse is set.
+        """
+        payload = json.dumps({'p': self._position(obj), 'r': reverse}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Return the (position, reverse) pair of a token or None if it is invalid.
+        """
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(payload)
+            position, reverse = data['p'], bool(data['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            return None
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            return None
+        return position, reverse
+
+    def _keyset_filter(self, position, reverse):
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, position):
+            name = self._field_name(order)
+            descending = order.startswith('-')
+            lookup = 'gt' if descending == reverse else 'lt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(order[1:] if order.startswith('-') else f'-{order}' for order in self.ordering)
+
+    def page(self, cursor=None, params=None):
+        """
+        Return the CursorPage starting at cursor, or the first page.
+        """
+        queryset, decoded, reverse = self._page_queryset(cursor)
+        return self._make_page(list(queryset), decoded, reverse, params)
+
+    async def apage(self, cursor=None, params=None):
+        """
+        Asynchronous version of page.
+        """
+        queryset, decoded, reverse = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], decoded, reverse, params)
+
+    def _page_queryset(self, cursor):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        queryset = self.queryset.order_by(*self.ordering)
+        reverse = False
+
+        if decoded is not None:
+            position, reverse = decoded
+            try:
+                queryset = self.queryset.filter(self._keyset_filter(position, reverse))
+            except (ValueError, TypeError, ValidationError):
+                # A tampered cursor delivers the first page.
+                decoded, reverse = None, False
+            else:
+                queryset = queryset.order_by(*(self._reversed_ordering() if reverse else self.ordering))
+
+        return queryset[:self.per_page + 1], decoded, reverse
+
+    def _make_page(self, rows, decoded, reverse, params):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, decoded is not None
+
+        next_cursor = self.encode_cursor(rows[-1]) if has_next and rows else None
+        previous_cursor = self.encode_cursor(rows[0], reverse=True) if has_previous and rows else None
+
+        if params is None:
+            params = QueryDict()
+        return CursorPage(rows, next_cursor, previous_cursor, params, self.cursor_param)
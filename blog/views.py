@@ -1,16 +1,44 @@
 import re
 
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponseRedirect, HttpResponseForbidden
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import Q
+from django.views.decorators.http import require_POST
 from django.utils.text import slugify
 
-from .models import Post, PostLike, PostDislike, Comment, CommentLike, CommentDislike
-from .utils import paginate_objects
+from core.sqlite import retry_on_lock
+
+from . import exporting, rankings, search
+from .cache import tag_response, post_tag, category_tag, author_tag, POST_LIST_TAG
+from .conditional import conditional_page, post_detail_validators, post_list_validators
+from .decorators import cache_anonymous_page
+from .models import Post, PostVote, Comment, CommentVote
+from .utils import paginate_objects, paginate_cursor, posts_per_page
 from .forms import CommentForm, PostForm
 
+COMMENTS_PER_PAGE = 10
+
+RANKING_SIZE = 10
+
+# Sidebar periods and the number of calendar days, today included, they cover.
+PERIODS = {
+    'today': 1,
+    'week': 7,
+    'month': 30,
+}
+
 
+@conditional_page(post_list_validators(lambda: Post.published.all()))
+@cache_anonymous_page
 def post_list(request):
     """
     Render a list of all published posts.
@@ -21,11 +49,14 @@ def post_list(request):
     Returns:
         HttpResponse: Rendered HTML response containing the list of posts.
     """
-    objects = Post.published.all()
-    posts = paginate_objects(request, objects)
-    return render(request, 'blog/post/list.html', {'posts': posts})
+    objects = Post.published.for_list()
+    posts = paginate_cursor(request, objects, posts_per_page())
+    response = render(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, POST_LIST_TAG, *(post_tag(post.id) for post in posts))
 
 
+@conditional_page(post_detail_validators)
+@cache_anonymous_page
 def post_detail(request, year, month, day, post_slug):
     """
     Render details of a specific post.
@@ -40,17 +71,25 @@ def post_detail(request, year, month, day, post_slug):
     Returns:
         HttpResponse: Rendered HTML response containing the details of the post.
     """
-    post = get_object_or_404(Post,
-                             slug=post_slug,
-                             status='published',
-                             publish__year=year,
-                             publish__month=month,
-                             publish__day=day)
+    post = get_object_or_404(Post.published.published_in(year, month, day)
+                                           .select_related('author')
+                                           .with_reactions(request.user),
+                             slug=post_slug)
+    comments = paginate_cursor(request,
+                               post.comments.select_related('author').with_reactions(request.user),
+                               COMMENTS_PER_PAGE)
     form = CommentForm()
-    return render(request, 'blog/post/detail.html', {'post': post, 'form': form})
+    context = {
+        'post': post,
+        'comments': comments,
+        'form': form
+    }
+    response = render(request, 'blog/post/detail.html', context)
+    return tag_response(response, post_tag(post.id))
 
 
 @login_required(login_url='../../accounts/register/')
+@retry_on_lock(methods=('POST',))
 def add_post(request):
     """
     View function to add a new post.
@@ -74,7 +113,31 @@ def add_post(request):
     return render(request, 'blog/post/create.html', {'form': form})
 
 
+@cache_anonymous_page
+def post_comments(request, post_id):
+    """
+    Render the next page of comments of a post as an HTML fragment.
+
+    Used by the "load more" button of the post page, the page is selected
+    by the cursor GET parameter.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        post_id (int): ID of the post.
+
+    Returns:
+        HttpResponse: Rendered comments followed by the next "load more" link.
+    """
+    post = get_object_or_404(Post.published.only('id', 'slug', 'publish'), id=post_id)
+    comments = paginate_cursor(request,
+                               post.comments.select_related('author').with_reactions(request.user),
+                               COMMENTS_PER_PAGE)
+    response = render(request, 'blog/comment/_page.html', {'post': post, 'comments': comments})
+    return tag_response(response, post_tag(post.id))
+
+
 @login_required
+@retry_on_lock(methods=('POST',))
 def update_post(request, post_id):
     """
     View function to update an existing post.
@@ -88,7 +151,7 @@ def update_post(request, post_id):
     """
     post = get_object_or_404(Post, id=post_id)
 
-    if request.user != post.author:
+    if request.user.id != post.author_id:
         return HttpResponseForbidden("You don't have permission to edit this post.")
 
     if request.method == 'POST':
@@ -104,6 +167,7 @@ def update_post(request, post_id):
 
 
 @login_required
+@retry_on_lock
 def delete_post(request, post_id):
     """
     View function to delete an existing post.
@@ -117,13 +181,15 @@ def delete_post(request, post_id):
     """
     post = get_object_or_404(Post, id=post_id)
 
-    if request.user != post.author:
+    if request.user.id != post.author_id:
         return HttpResponseForbidden("You don't have permission to delete this post.")
 
     post.delete()
     return redirect('blog:post_list')
 
 
+@conditional_page(post_list_validators(lambda category: Post.published.filter(category__slug=category)))
+@cache_anonymous_page
 def post_category(request, category):
     """
     Render a list of posts filtered by category.
@@ -135,11 +201,14 @@ def post_category(request, category):
     Returns:
         HttpResponse: Rendered HTML response containing the filtered list of posts.
     """
-    objects = Post.published.filter(category__slug=category)
-    posts = paginate_objects(request, objects)
-    return render(request, 'blog/post/list.html', {'posts': posts})
+    objects = Post.published.for_list().filter(category__slug=category)
+    posts = paginate_cursor(request, objects, posts_per_page())
+    response = render(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, category_tag(category), *(post_tag(post.id) for post in posts))
 
 
+@conditional_page(post_list_validators(lambda author: Post.published.filter(author__username=author)))
+@cache_anonymous_page
 def post_author(request, author):
     """
     Render a list of posts filtered by author.
@@ -151,9 +220,85 @@ def post_author(request, author):
     Returns:
         HttpResponse: Rendered HTML response containing the filtered list of posts.
     """
-    objects = Post.published.filter(author__username=author)
-    posts = paginate_objects(request, objects)
-    return render(request, 'blog/post/list.html', {'posts': posts})
+    objects = Post.published.for_list().filter(author__username=author)
+    posts = paginate_cursor(request, objects, posts_per_page())
+    response = render(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, author_tag(author), *(post_tag(post.id) for post in posts))
+
+
+def _period_posts(period):
+    if period not in PERIODS:
+        raise Http404('Unknown period')
+    return Post.published.published_within(PERIODS[period])
+
+
+@conditional_page(post_list_validators(_period_posts))
+@cache_anonymous_page
+def post_period(request, period):
+    """
+    Render a list of posts published during a recent period.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        period (str): One of the PERIODS keys, e.g. 'week'.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the posts of the period.
+    """
+    objects = _period_posts(period).for_list()
+    posts = paginate_cursor(request, objects, posts_per_page())
+    response = render(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, POST_LIST_TAG, *(post_tag(post.id) for post in posts))
+
+
+@conditional_page(post_list_validators(lambda year, month: Post.published.published_in(year, month)))
+@cache_anonymous_page
+def post_archive(request, year, month):
+    """
+    Render a list of posts published in a month.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        year (int): Year of publication.
+        month (int): Month of publication.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the posts of the month.
+    """
+    objects = Post.published.published_in(year, month).for_list()
+    posts = paginate_cursor(request, objects, posts_per_page())
+    response = render(request, 'blog/post/list.html', {'posts': posts})
+    return tag_response(response, POST_LIST_TAG, *(post_tag(post.id) for post in posts))
+
+
+def post_trending(request, category=None):
+    """
+    Render the posts with the most recent reactions and comments.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        category (str): Slug of a category to rank within, all posts if omitted.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the trending posts.
+    """
+    posts = rankings.top_posts('trending', category, RANKING_SIZE)
+    return render(request, 'blog/post/list.html', {'posts': posts, 'list_title': 'Trending'})
+
+
+def post_discussed(request, category=None):
+    """
+    Render the posts with the most recent comments.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        category (str): Slug of a category to rank within, all posts if omitted.
+
+    Returns:
+        HttpResponse: Rendered HTML response containing the most discussed posts.
+    """
+    posts = rankings.top_posts('discussion', category, RANKING_SIZE)
+    return render(request, 'blog/post/list.html', {'posts': posts, 'list_title': 'Most discussed'})
 
 
 def search_post(request):
@@ -168,7 +313,7 @@ def search_post(request):
     """
     search_query = request.GET.get('search_query')
     search_param = request.GET.get('search_param')
-    posts = Post.published.all()
+    posts = Post.published.for_list()
 
     if search_query:
         if search_param == 'author':
@@ -176,28 +321,24 @@ def search_post(request):
         elif search_param == 'title':
             posts = posts.filter(title__icontains=search_query)
         elif search_param == 'post':
-            posts = posts.filter(
-                Q(title__icontains=search_query) | Q(body__icontains=search_query)
-            )
+            if search.fts_available():
+                # Ranked full-text results, sliced lazily by the paginator.
+                posts = search.FullTextResults(search_query)
+            else:
+                posts = posts.filter(
+                    Q(title__icontains=search_query) | Q(body__icontains=search_query)
+                )
 
         elif search_param == 'publish':
             parts = re.split(r'\W', search_query)
-            year = parts[0]
-            month = parts[1] if len(parts) > 1 else None
-            day = parts[2] if len(parts) > 2 else None
-
-            if month and day:
-                posts = posts.filter(publish__year=year, publish__month=month, publish__day=day)
-            elif month:
-                posts = posts.filter(publish__year=year, publish__month=month)
-            else:
-                posts = posts.filter(publish__year=year)
+            posts = posts.published_in(*parts[:3])
 
-    posts = paginate_objects(request, posts)
+    posts = paginate_objects(request, posts, posts_per_page())
     return render(request, 'blog/post/list.html', {'posts': posts})
 
 
 @login_required(login_url='../../../../accounts/register/')
+@retry_on_lock
 def like_post(request, post_id):
     """
     Like a post.
@@ -209,20 +350,13 @@ def like_post(request, post_id):
     Returns:
         HttpResponseRedirect: Redirects to the detail page of the liked post.
     """
-    post = get_object_or_404(Post, id=post_id)
-
-    if post.is_liked_by(request.user):
-        like = post.likes.get(user=request.user)
-        like.delete()
-    else:
-        PostLike.objects.create(post=post, user=request.user)
-        if post.is_disliked_by(request.user):
-            dislike = post.dislikes.get(user=request.user)
-            dislike.delete()
+    post = get_object_or_404(Post.objects.only('id', 'slug', 'publish'), id=post_id)
+    PostVote.objects.toggle(post, request.user, PostVote.LIKE)
     return HttpResponseRedirect(f'{post.get_absolute_url()}#postlikeDislike')
 
 
 @login_required(login_url='../../../../accounts/register/')
+@retry_on_lock
 def dislike_post(request, post_id):
     """
     Dislike a post.
@@ -234,20 +368,107 @@ def dislike_post(request, post_id):
     Returns:
         HttpResponseRedirect: Redirects to the detail page of the disliked post.
     """
-    post = get_object_or_404(Post, id=post_id)
-
-    if post.is_disliked_by(request.user):
-        dislike = post.dislikes.get(user=request.user)
-        dislike.delete()
-    else:
-        PostDislike.objects.create(post=post, user=request.user)
-        if post.is_liked_by(request.user):
-            like = post.likes.get(user=request.user)
-            like.delete()
+    post = get_object_or_404(Post.objects.only('id', 'slug', 'publish'), id=post_id)
+    PostVote.objects.toggle(post, request.user, PostVote.DISLIKE)
     return HttpResponseRedirect(f'{post.get_absolute_url()}#postlikeDislike')
 
 
+def _vote_json(request, queryset, object_id, value):
+    """
+    Toggle a vote of the current user and describe the new state as JSON.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        queryset: Posts or comments the voted object is looked up in,
+            restricted to the columns the vote needs.
+        object_id (int): ID of the voted object.
+        value (int): LIKE or DISLIKE.
+
+    Returns:
+        JsonResponse: New counters and the user's like and dislike flags,
+        or an error with status 401 for anonymous users.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    target = get_object_or_404(queryset, id=object_id)
+    vote_model = queryset.model._meta.get_field('votes').related_model
+    vote = vote_model.objects.toggle(target, request.user, value)
+    target.refresh_from_db(fields=['likes_count', 'dislikes_count'])
+    return JsonResponse({
+        'likes': target.likes_count,
+        'dislikes': target.dislikes_count,
+        'liked': vote == vote_model.LIKE,
+        'disliked': vote == vote_model.DISLIKE,
+    })
+
+
+@require_POST
+@retry_on_lock
+def like_post_json(request, post_id):
+    """
+    Like a post without reloading the page.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        post_id (int): ID of the post to like.
+
+    Returns:
+        JsonResponse: New reaction state of the post.
+    """
+    return _vote_json(request, Post.objects.only('id'), post_id, PostVote.LIKE)
+
+
+@require_POST
+@retry_on_lock
+def dislike_post_json(request, post_id):
+    """
+    Dislike a post without reloading the page.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        post_id (int): ID of the post to dislike.
+
+    Returns:
+        JsonResponse: New reaction state of the post.
+    """
+    return _vote_json(request, Post.objects.only('id'), post_id, PostVote.DISLIKE)
+
+
+@require_POST
+@retry_on_lock
+def like_comment_json(request, comment_id):
+    """
+    Like a comment without reloading the page.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        comment_id (int): ID of the comment to like.
+
+    Returns:
+        JsonResponse: New reaction state of the comment.
+    """
+    return _vote_json(request, Comment.objects.only('id', 'post'), comment_id, CommentVote.LIKE)
+
+
+@require_POST
+@retry_on_lock
+def dislike_comment_json(request, comment_id):
+    """
+    Dislike a comment without reloading the page.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        comment_id (int): ID of the comment to dislike.
+
+    Returns:
+        JsonResponse: New reaction state of the comment.
+    """
+    return _vote_json(request, Comment.objects.only('id', 'post'), comment_id, CommentVote.DISLIKE)
+
+
 @login_required(login_url='../../../../accounts/register/')
+@retry_on_lock(methods=('POST',))
 def add_comment(request, post_id):
     """
     Add a comment to a post.
@@ -271,6 +492,7 @@ def add_comment(request, post_id):
 
 
 @login_required(login_url='../../../../accounts/register/')
+@retry_on_lock
 def like_comment(request, comment_id):
     """
     View function to like a comment.
@@ -282,20 +504,14 @@ def like_comment(request, comment_id):
     Returns:
         HttpResponseRedirect: Redirects to the post detail page with the comment anchor.
     """
-    comment = get_object_or_404(Comment, id=comment_id)
-
-    if comment.is_liked_by(request.user):
-        like = comment.likes.get(user=request.user)
-        like.delete()
-    else:
-        CommentLike.objects.create(comment=comment, user=request.user)
-        if comment.is_disliked_by(request.user):
-            dislike = comment.dislikes.get(user=request.user)
-            dislike.delete()
+    comment = get_object_or_404(Comment.objects.select_related('post').only('id', 'post__slug', 'post__publish'),
+                                id=comment_id)
+    CommentVote.objects.toggle(comment, request.user, CommentVote.LIKE)
     return HttpResponseRedirect(f'{comment.post.get_absolute_url()}#commentLike{comment.id}')
 
 
 @login_required(login_url='../../../../accounts/register/')
+@retry_on_lock
 def dislike_comment(request, comment_id):
     """
     View function to dislike a comment.
@@ -307,21 +523,15 @@ def dislike_comment(request, comment_id):
     Returns:
         HttpResponseRedirect: Redirects to the post detail page with the comment anchor.
     """
-    comment = get_object_or_404(Comment, id=comment_id)
-
-    if comment.is_disliked_by(request.user):
-        dislike = comment.dislikes.get(user=request.user)
-        dislike.delete()
-    else:
-        CommentDislike.objects.create(comment=comment, user=request.user)
-        if comment.is_liked_by(request.user):
-            like = comment.likes.get(user=request.user)
-            like.delete()
+    comment = get_object_or_404(Comment.objects.select_related('post').only('id', 'post__slug', 'post__publish'),
+                                id=comment_id)
+    CommentVote.objects.toggle(comment, request.user, CommentVote.DISLIKE)
     return HttpResponseRedirect(f'{comment.post.get_absolute_url()}#commentLike{comment.id}')
 
 
 @login_required
 @user_passes_test(lambda user: user.is_superuser)
+@retry_on_lock
 def delete_comment(request, comment_id):
     """
     View function to delete a comment.
@@ -348,6 +558,7 @@ def toggle_comment_active(request, comment_id):
 
 @login_required
 @user_passes_test(lambda user: user.is_superuser)
+@retry_on_lock
 def toggle_comment_active(request, comment_id):
     """
     View function to toggle the active status of a comment.
@@ -362,4 +573,42 @@ def toggle_comment_active(request, comment_id):
     comment = get_object_or_404(Comment, id=comment_id)
     comment.active = not comment.active
     comment.save()
-    return HttpResponseRedirect(f'{comment.post.get_absolute_url()}#comments')
\ No newline at end of file
+    return HttpResponseRedirect(f'{comment.post.get_absolute_url()}#comments')
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def export_data(request, kind):
+    """
+    Stream a full or filtered dump of a blog table to staff users.
+
+    The format and filters are read from the GET parameters format (jsonl or
+    csv), since, until (YYYY-MM-DD, inclusive), category and author. Under
+    ASGI the dump is streamed through an asynchronous iterator.
+
+    Args:
+        request: HttpRequest object representing the current request.
+        kind (str): Exported table, a key of blog.exporting.EXPORTS.
+
+    Returns:
+        StreamingHttpResponse: The dump as an attachment, or a 400 response
+        for invalid parameters.
+    """
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in exporting.FORMATS:
+        return HttpResponseBadRequest('format must be jsonl or csv')
+    try:
+        fields, rows = exporting.export_rows(kind,
+                                             since=request.GET.get('since'),
+                                             until=request.GET.get('until'),
+                                             category=request.GET.get('category'),
+                                             author=request.GET.get('author'))
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    lines = exporting.serialize(fields, rows, fmt)
+    if isinstance(request, ASGIRequest):
+        lines = exporting.aiterate(lines)
+    response = StreamingHttpResponse(lines, content_type=exporting.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
@@ -0,0 +1,28 @@
+from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    """
+    AppConfig for project-wide infrastructure.
+
+    Attributes:
+        name (str): The name of the application.
+    """
+    name = 'core'
+
+    def ready(self):
+        """
+        Tune every new SQLite connection, profile the queries of every connection,
+        watch the writes to the primary and count logins.
+        """
+        from .metrics import count_login, count_login_failure
+        from .profiling import install_query_recorder
+        from .routers import install_write_recorder
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid='core.sqlite.configure_connection')
+        connection_created.connect(install_query_recorder, dispatch_uid='core.profiling.install_query_recorder')
+        connection_created.connect(install_write_recorder, dispatch_uid='core.routers.install_write_recorder')
+        user_logged_in.connect(count_login, dispatch_uid='core.metrics.count_login')
+        user_login_failed.connect(count_login_failure, dispatch_uid='core.metrics.count_login_failure')
@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from core.metrics import EMAIL_SEND_LATENCY
+
+
+class EmailBackend(BaseEmailBackend):
+    """
+    Email backend timing the sends of the backend named by EMAIL_DELIVERY_BACKEND.
+
+    Every batch is recorded in the email_send_duration_seconds histogram,
+    labeled sent or failed.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently)
+        self.backend = get_connection(settings.EMAIL_DELIVERY_BACKEND, fail_silently=fail_silently, **kwargs)
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, email_messages):
+        started = time.perf_counter()
+        result = 'failed'
+        try:
+            sent = self.backend.send_messages(email_messages)
+            if sent or not email_messages:
+                result = 'sent'
+            return sent
+        finally:
+            EMAIL_SEND_LATENCY.observe(time.perf_counter() - started, result=result)
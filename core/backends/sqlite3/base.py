@@ -0,0 +1,28 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend accepting the transaction_mode option of Django 5.1.
+
+    With OPTIONS = {'transaction_mode': 'IMMEDIATE'} every transaction takes
+    the write lock when it begins, waiting up to busy_timeout for it.
+    Deferred transactions take it at their first write instead and fail at
+    once if another connection wrote since their first read, which
+    busy_timeout can not help with. core.sqlite.immediate_atomic begins a
+    single transaction in IMMEDIATE mode, for the write paths only.
+
+    Attributes:
+        begin_immediate (bool): Begin the next transaction in IMMEDIATE mode,
+            whatever the option says.
+    """
+    begin_immediate = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('transaction_mode', None)
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = 'IMMEDIATE' if self.begin_immediate else self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
@@ -0,0 +1,22 @@
+from django.template.backends import django
+
+from core.profiling import timed_rendering
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """
+    Django template backend adding the render time to the request profile.
+    """
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name).template, self)
+
+
+class Template(django.Template):
+
+    def render(self, context=None, request=None):
+        with timed_rendering():
+            return super().render(context, request)
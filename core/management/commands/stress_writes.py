@@ -0,0 +1,163 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from blog import views
+from blog.models import Post, Comment
+
+User = get_user_model()
+
+# Settings and database OPTIONS of the configurations, None keeps the project ones.
+CONFIGURATIONS = {
+    'stock': ({'SQLITE_PRAGMAS': {}, 'SQLITE_IMMEDIATE_WRITES': False, 'SQLITE_LOCK_RETRIES': 0}, {}),
+    'tuned': (None, None),
+}
+
+
+class Command(BaseCommand):
+    """
+    Measure throughput and lock errors of concurrent likes and comments.
+
+    Writer threads call the like and comment views directly, each as its own
+    user, while reader threads load the comments and the post list. Every
+    configuration runs on a fresh copy of the database, nothing is written
+    to the real one. "stock" uses the rollback journal, deferred
+    transactions, no pragmas and no retries; "tuned" uses the project
+    settings: SQLITE_PRAGMAS, SQLITE_IMMEDIATE_WRITES and SQLITE_LOCK_RETRIES.
+    """
+    help = 'Compare concurrent write throughput and lock errors with and without the SQLite tuning.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per configuration.')
+        parser.add_argument('--no-tuning', action='store_true', help='Only run the stock configuration.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The stress test measures SQLite locking only.')
+        if not Post.published.exists():
+            raise CommandError('At least one published post is needed.')
+
+        names = ['stock'] if options['no_tuning'] else list(CONFIGURATIONS)
+        self.stdout.write(f'{"configuration":<13} {"writes/s":>9} {"errors":>7} {"error %":>8} '
+                          f'{"p95 ms":>7} {"reads/s":>8} {"read errors":>11}')
+        for name in names:
+            result = self._run_on_copy(name, options)
+            self.stdout.write(f'{name:<13} {result["writes"] / options["duration"]:>9.1f} '
+                              f'{sum(result["write_errors"].values()):>7} {result["error_rate"]:>8.1%} '
+                              f'{result["p95"]:>7.1f} {result["reads"] / options["duration"]:>8.1f} '
+                              f'{sum(result["read_errors"].values()):>11}')
+            for error, count in (result['write_errors'] + result['read_errors']).most_common():
+                self.stdout.write(f'  {count} x {error}')
+
+    def _run_on_copy(self, name, options):
+        source = connection.settings_dict['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            copy = os.path.join(directory, 'stress.sqlite3')
+            with sqlite3.connect(source) as original, sqlite3.connect(copy) as target:
+                original.backup(target)
+                target.execute('PRAGMA journal_mode = delete')
+            original.close()
+            target.close()
+
+            # New connections of every thread are opened on the copy.
+            overrides, database_options = CONFIGURATIONS[name]
+            source_options = connection.settings_dict['OPTIONS']
+            connections.close_all()
+            connection.settings_dict['NAME'] = copy
+            if database_options is not None:
+                connection.settings_dict['OPTIONS'] = database_options
+            try:
+                with override_settings(**(overrides or {})):
+                    return self._stress(options)
+            finally:
+                connections.close_all()
+                connection.settings_dict['NAME'] = source
+                connection.settings_dict['OPTIONS'] = source_options
+
+    def _stress(self, options):
+        post_id = Post.published.values_list('id', flat=True).first()
+        User.objects.bulk_create([User(username=f'stress-writer-{index}',
+                                       email=f'stress-writer-{index}@example.com',
+                                       password='!')
+                                  for index in range(options['writers'])])
+        users = list(User.objects.filter(username__startswith='stress-writer-'))
+        connections.close_all()
+
+        factory = RequestFactory()
+        deadline = time.monotonic() + options['duration']
+        latencies = []
+        totals = Counter()
+        write_errors = Counter()
+        read_errors = Counter()
+        lock = threading.Lock()
+
+        def write(user):
+            done, spent, errors = 0, [], Counter()
+            try:
+                while time.monotonic() < deadline:
+                    if done % 2:
+                        request, view = factory.post(f'/post/{post_id}/like/json/'), views.like_post_json
+                    else:
+                        request = factory.post(f'/post/{post_id}/add_comment/', {'body': f'Stress {done}'})
+                        view = views.add_comment
+                    request.user = user
+                    started = time.perf_counter()
+                    try:
+                        view(request, post_id)
+                    except OperationalError as error:
+                        errors[f'write: {error}'] += 1
+                    else:
+                        spent.append(time.perf_counter() - started)
+                    done += 1
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(spent)
+                totals['writes'] += len(spent)
+                write_errors.update(errors)
+
+        def read():
+            done, errors = 0, Counter()
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        list(Comment.objects.filter(post_id=post_id).select_related('author')[:10])
+                        list(Post.published.for_list()[:10])
+                    except OperationalError as error:
+                        errors[f'read: {error}'] += 1
+                    else:
+                        done += 1
+            finally:
+                connections.close_all()
+            with lock:
+                totals['reads'] += done
+                read_errors.update(errors)
+
+        threads = [threading.Thread(target=write, args=(user,)) for user in users]
+        threads += [threading.Thread(target=read) for _ in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        attempts = totals['writes'] + sum(write_errors.values())
+        return {
+            'writes': totals['writes'],
+            'reads': totals['reads'],
+            'write_errors': write_errors,
+            'read_errors': read_errors,
+            'error_rate': sum(write_errors.values()) / attempts if attempts else 0.0,
+            'p95': statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else 0.0,
+        }
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    """
+    Copy the primary SQLite database into the replica files.
+
+    Stands in for replication when the replicas are local SQLite copies.
+    The online backup API copies a consistent snapshot while the primary
+    keeps serving requests, and readers of a replica switch to the new
+    pages once its copy is complete.
+    """
+    help = 'Copy the primary SQLite database into every replica listed in DATABASE_REPLICAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep copying every this many seconds instead of once.')
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('No replicas configured, set SQLITE_REPLICAS or DATABASE_REPLICAS.')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if any(connections[alias].vendor != 'sqlite' for alias in [DEFAULT_DB_ALIAS, *aliases]):
+            raise CommandError('Only SQLite replicas can be copied, other databases replicate themselves.')
+
+        while True:
+            for alias in aliases:
+                started = time.perf_counter()
+                self._copy(primary.settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+                self.stdout.write(f'{alias}: copied in {time.perf_counter() - started:.2f}s')
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def _copy(self, source, target):
+        with sqlite3.connect(source) as original, sqlite3.connect(target) as replica:
+            original.backup(replica)
+        original.close()
+        replica.close()
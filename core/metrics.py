@@ -0,0 +1,309 @@
+import atexit
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds between two dumps of the values of a process in multiprocess mode.
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """
+    Base class of the metrics, holding one value per combination of label values.
+
+    Attributes:
+        name (str): Metric name, e.g. 'http_requests_total'.
+        documentation (str): HELP text.
+        labelnames (tuple): Names of the labels every sample carries.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f'{self.name} takes the labels {", ".join(self.labelnames)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+    @abstractmethod
+    def samples(self, values):
+        """
+        Yield the exposition lines of the given values, keyed by label values.
+        """
+
+
+class Counter(Metric):
+    """
+    Value that only goes up, e.g. the number of requests.
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def samples(self, values):
+        if not self.labelnames and not values:
+            values = {(): 0}
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values, e.g. request latencies, over fixed buckets.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = (*sorted(buckets), math.inf)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Bucket counts are stored per bucket and summed up on exposition.
+        index = next(index for index, bound in enumerate(self.buckets) if value <= bound)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    def snapshot(self):
+        with self.lock:
+            return [[list(key), [list(counts), total]] for key, (counts, total) in self.values.items()]
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return list(value[0]), value[1]
+        return [a + b for a, b in zip(total[0], value[0])], total[1] + value[1]
+
+    def samples(self, values):
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {_format_value(cumulative)}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {_format_value(cumulative)}'
+
+
+class Ratio(Metric):
+    """
+    Gauge derived from a counter: the share of its samples with one label value.
+
+    E.g. the cache hit ratio is the share of cache lookups with result="hit",
+    computed per namespace when the metrics are exposed.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, counter, label, value):
+        super().__init__(name, documentation, [name for name in counter.labelnames if name != label])
+        self.counter = counter
+        self.position = counter.labelnames.index(label)
+        self.value = value
+
+    def snapshot(self):
+        return []
+
+    def samples(self, values):
+        """
+        Yield the ratios computed from the values of the counter.
+        """
+        matching, totals = {}, {}
+        for key, count in values.items():
+            group = key[:self.position] + key[self.position + 1:]
+            totals[group] = totals.get(group, 0) + count
+            if key[self.position] == self.value:
+                matching[group] = matching.get(group, 0) + count
+        for group, total in sorted(totals.items()):
+            if total:
+                yield f'{self.name}{_format_labels(self.labelnames, group)} ' \
+                      f'{_format_value(matching.get(group, 0) / total)}'
+
+
+class Registry:
+    """
+    Metrics of the process, exposed in the Prometheus text format.
+
+    With METRICS_MULTIPROCESS_DIR set, every process regularly dumps its
+    values to a file of its own in that directory, and the exposition sums
+    the files of all processes, so any worker answers for all of them.
+    Files of exited processes are kept, their counts stay in the totals;
+    empty the directory when the server is restarted.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.last_flush = 0.0
+        self.flush_lock = threading.Lock()
+        self.pid = None
+        self.file_name = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def ratio(self, *args, **kwargs):
+        return self.register(Ratio(*args, **kwargs))
+
+    @staticmethod
+    def directory():
+        path = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+        return Path(path) if path else None
+
+    def flush(self):
+        """
+        Dump the values of this process to its file in the multiprocess directory.
+
+        The file is replaced atomically, readers never see a partial dump.
+        """
+        directory = self.directory()
+        if directory is None:
+            return
+        with self.flush_lock:
+            data = {name: metric.snapshot() for name, metric in self.metrics.items()}
+            if not any(data.values()):
+                return
+            if self.pid != os.getpid():
+                # Named on the first dump, workers forked from one parent get files of their own.
+                self.pid = os.getpid()
+                self.file_name = f'{self.pid}-{time.time_ns()}.json'
+            directory.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as file:
+                json.dump(data, file)
+            os.replace(file.name, directory / self.file_name)
+            self.last_flush = time.monotonic()
+
+    def flush_due(self):
+        """
+        Tell whether the values of this process should be dumped again.
+        """
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        return self.directory() is not None and time.monotonic() - self.last_flush >= interval
+
+    def flush_if_due(self):
+        if self.flush_due():
+            self.flush()
+
+    def _collect(self):
+        """
+        Return the values of every metric keyed by label values, summed over all processes.
+        """
+        directory = self.directory()
+        if directory is None:
+            return {name: {tuple(key): value for key, value in metric.snapshot()}
+                    for name, metric in self.metrics.items()}
+
+        self.flush()
+        collected = {name: {} for name in self.metrics}
+        for path in directory.glob('*.json'):
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # Replaced or removed while being read.
+                continue
+            for name, samples in data.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = collected[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = metric.merge(values.get(key), value)
+        return collected
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        collected = self._collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            source = metric.counter.name if isinstance(metric, Ratio) else name
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.samples(collected[source]))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time from receiving a request to returning its response.',
+    ['view', 'method'])
+RESPONSES = REGISTRY.counter(
+    'http_responses_total', 'Responses by status code.', ['view', 'status'])
+DB_QUERIES = REGISTRY.counter(
+    'db_queries_total', 'SQL statements executed while handling requests.', ['view'])
+DB_QUERY_TIME = REGISTRY.counter(
+    'db_query_seconds_total', 'Time spent executing SQL statements while handling requests.', ['view'])
+CACHE_LOOKUPS = REGISTRY.counter(
+    'cache_lookups_total', 'Lookups of cached values by result, hit or miss.', ['namespace', 'result'])
+CACHE_HIT_RATIO = REGISTRY.ratio(
+    'cache_hit_ratio', 'Share of cache lookups answered from the cache.', CACHE_LOOKUPS, 'result', 'hit')
+LOGINS = REGISTRY.counter(
+    'auth_logins_total', 'Login attempts by result, success or failure.', ['result'])
+REGISTRATIONS = REGISTRY.counter(
+    'auth_registrations_total', 'Accounts created through the registration form.')
+EMAIL_SEND_LATENCY = REGISTRY.histogram(
+    'email_send_duration_seconds', 'Time spent sending a batch of emails, by result.', ['result'])
+
+
+def count_login(sender, **kwargs):
+    LOGINS.inc(result='success')
+
+
+def count_login_failure(sender, **kwargs):
+    LOGINS.inc(result='failure')
@@ -0,0 +1,159 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics
+from .profiling import check_profile, start_profile, stop_profile
+from .routers import PIN_COOKIE, DEFAULT_PIN_SECONDS, replica_aliases, routed_request
+
+
+class ReplicaPinMiddleware:
+    """
+    Middleware keeping the reads of a client on the primary database after it wrote.
+
+    Reads of the request that wrote already go to the primary. The pin
+    cookie set on its response does the same for the following requests,
+    e.g. the page a form redirects to, until the replicas caught up after
+    DATABASE_REPLICA_PIN_SECONDS. Runs natively in WSGI and ASGI requests.
+
+    Attributes:
+        get_response: The next middleware in the chain or the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with routed_request(pinned=PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        with routed_request(pinned=PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self._pin(state, response)
+
+    def _pin(self, state, response):
+        if state.wrote and replica_aliases():
+            response.set_cookie(PIN_COOKIE, '1', httponly=True, samesite='Lax',
+                                max_age=getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS))
+        return response
+
+
+def _loaded_user(request):
+    """
+    Return the user of the request if the view already loaded it, None otherwise.
+
+    Loading it after the view would add session and user queries to the request.
+    """
+    return getattr(request, '_cached_user', None) or getattr(request, '_acached_user', None)
+
+
+class RequestProfileMiddleware:
+    """
+    Middleware profiling the queries, template rendering and cache use of each request.
+
+    Duplicate queries are logged, and so are views running more queries than
+    their QUERY_BUDGETS entry allows; with QUERY_BUDGETS_STRICT the request
+    fails instead. Staff users get the profile in a Server-Timing header on
+    the pages that loaded the user.
+    Runs natively in WSGI and ASGI requests.
+
+    Attributes:
+        get_response: The next middleware in the chain or the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        profile, token = start_profile()
+        request.profile = profile
+        try:
+            response = self.get_response(request)
+            profile.finish(request)
+        finally:
+            stop_profile(token)
+        check_profile(profile)
+        user = _loaded_user(request)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = profile.summary()
+        return response
+
+    async def __acall__(self, request):
+        profile, token = start_profile()
+        request.profile = profile
+        try:
+            response = await self.get_response(request)
+            profile.finish(request)
+        finally:
+            stop_profile(token)
+        check_profile(profile)
+        user = _loaded_user(request)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = profile.summary()
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording the latency, status and queries of each request in core.metrics.
+
+    Requests are labeled by URL name. The query counts come from the request
+    profile, so RequestProfileMiddleware must come after this middleware.
+    Runs natively in WSGI and ASGI requests.
+
+    Attributes:
+        get_response: The next middleware in the chain or the view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        metrics.REGISTRY.flush_if_due()
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        if metrics.REGISTRY.flush_due():
+            # Writing the file would block the event loop.
+            await sync_to_async(metrics.REGISTRY.flush)()
+        return response
+
+    def _record(self, request, response, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics.REQUEST_LATENCY.observe(duration, view=view, method=request.method)
+        metrics.RESPONSES.inc(view=view, status=response.status_code)
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            metrics.DB_QUERIES.inc(profile.queries, view=view)
+            metrics.DB_QUERY_TIME.inc(profile.sql_time, view=view)
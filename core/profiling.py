@@ -0,0 +1,183 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Budget of the views missing from QUERY_BUDGETS, None for no limit.
+DEFAULT_QUERY_BUDGET = None
+
+_profile = ContextVar('core.profiling.profile', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a view runs more queries than its QUERY_BUDGETS entry allows,
+    if QUERY_BUDGETS_STRICT is set.
+    """
+
+
+class RequestProfile:
+    """
+    Queries, template rendering and cache use of one request.
+
+    The profile is mutated in place, so work done in worker threads of an
+    asynchronous request is counted too.
+
+    Attributes:
+        view_name (str): Resolved URL name, None until the view is resolved.
+        queries (int): Number of executed SQL statements.
+        sql_time (float): Seconds spent executing them.
+        template_time (float): Seconds spent rendering templates, including
+            the queries run from templates.
+        cache_hits (int): Cache lookups answered from the cache.
+        cache_misses (int): Cache lookups that computed their value.
+        statements (Counter): Executions of each (SQL, parameters) pair.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.view_name = None
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statements = Counter()
+
+    @property
+    def duplicates(self):
+        """
+        Return the statements executed more than once, with their extra executions.
+        """
+        return {statement: count - 1 for statement, count in self.statements.items() if count > 1}
+
+    def finish(self, request):
+        match = getattr(request, 'resolver_match', None)
+        self.view_name = match.view_name if match else None
+        self.duration = time.perf_counter() - self.started
+
+    def summary(self):
+        """
+        Format the profile as a Server-Timing header value.
+        """
+        duplicates = sum(self.duplicates.values())
+        return (f'sql;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries, {duplicates} duplicates", '
+                f'templates;dur={self.template_time * 1000:.2f}, '
+                f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses", '
+                f'total;dur={self.duration * 1000:.2f}')
+
+
+def current_profile():
+    """
+    Return the profile of the current request, None outside of profiled requests.
+    """
+    return _profile.get()
+
+
+def start_profile():
+    """
+    Start profiling the current request.
+
+    Returns:
+        tuple: The new RequestProfile and the token resetting the previous one.
+    """
+    profile = RequestProfile()
+    return profile, _profile.set(profile)
+
+
+def stop_profile(token):
+    _profile.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper counting and timing the statements of the current request.
+
+    Installed on every database connection by install_query_recorder.
+    """
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_time += time.perf_counter() - started
+        profile.queries += 1
+        profile.statements[sql, repr(params)] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Add record_query to a new connection, receiver of connection_created.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed_rendering():
+    """
+    Add the time spent in the block to the template time of the current request.
+
+    Templates rendered while another one renders are part of its time.
+    """
+    profile = _profile.get()
+    if profile is None or profile.rendering:
+        yield
+        return
+    profile.rendering = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.rendering = False
+        profile.template_time += time.perf_counter() - started
+
+
+def record_cache(hits=0, misses=0):
+    profile = _profile.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+def query_budget(view_name):
+    """
+    Return the maximum number of queries of a view, None if unlimited.
+
+    Args:
+        view_name (str): Resolved URL name, e.g. 'blog:post_list'.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    return budgets.get(view_name, budgets.get('*', DEFAULT_QUERY_BUDGET))
+
+
+def check_profile(profile):
+    """
+    Log duplicate queries and enforce the query budget of the profiled view.
+
+    Args:
+        profile (RequestProfile): Finished profile of a request.
+
+    Raises:
+        QueryBudgetExceeded: If the budget is exceeded and QUERY_BUDGETS_STRICT is set.
+    """
+    logger.debug('%s: %s', profile.view_name, profile.summary())
+    for (sql, params), extra in profile.duplicates.items():
+        logger.warning('%s ran the same query %d times: %s %s', profile.view_name, extra + 1, sql, params)
+
+    budget = query_budget(profile.view_name)
+    if budget is None or profile.queries <= budget:
+        return
+    message = f'{profile.view_name} ran {profile.queries} queries, its budget is {budget}'
+    if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,132 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Name of the cookie keeping the reads of a client on the primary after it wrote.
+PIN_COOKIE = 'primary_pin'
+DEFAULT_PIN_SECONDS = 5
+
+# Statements that change the primary, they pin the request that runs them.
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class RequestState:
+    """
+    Routing state of one request.
+
+    Attributes:
+        pinned (bool): Reads go to the primary, set by the pin cookie or a write.
+        wrote (bool): The request wrote to the primary.
+    """
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# The state is mutated in place, so writes made in worker threads of an
+# asynchronous request are seen by the middleware. None outside of requests.
+_request_state = ContextVar('core.routers.request_state', default=None)
+_use_primary = ContextVar('core.routers.use_primary', default=False)
+
+
+def replica_aliases():
+    """
+    Return the database aliases reads may be sent to.
+    """
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+@contextmanager
+def routed_request(pinned=False):
+    """
+    Track the writes of a request and route its reads accordingly.
+
+    Args:
+        pinned (bool): Send every read of the request to the primary.
+
+    Yields:
+        RequestState: State of the request, its wrote flag tells if it wrote.
+    """
+    state = RequestState(pinned)
+    token = _request_state.set(state)
+    try:
+        yield state
+    finally:
+        _request_state.reset(token)
+
+
+def record_write(execute, sql, params, many, context):
+    """
+    Execute wrapper pinning the current request to the primary when it runs a write statement.
+
+    Installed on the primary connection by install_write_recorder. Asking
+    the router where to write is not enough, e.g. get_or_create asks it
+    before reading, and writes through a raw cursor never ask it.
+    """
+    state = _request_state.get()
+    if state is not None and not state.wrote and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        state.pinned = state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def install_write_recorder(sender, connection, **kwargs):
+    """
+    Add record_write to a new connection to the primary, receiver of connection_created.
+    """
+    if connection.alias == DEFAULT_DB_ALIAS and record_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_write)
+
+
+@contextmanager
+def primary():
+    """
+    Send every read of the block to the primary.
+
+    Used for data that outlives the request, e.g. cached pages: a lagging
+    replica would otherwise be frozen into the cache until the next
+    invalidation.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and spread the reads of requests over the replicas.
+
+    A request reads from the primary once it wrote, while the pin cookie of
+    an earlier write is set, inside a transaction, and for the apps listed in
+    DATABASE_PRIMARY_APPS. Reads made outside of a request, e.g. by
+    management commands, always go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or model._meta.app_label in getattr(settings, 'DATABASE_PRIMARY_APPS', ()):
+            return DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is None or state.pinned or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # The request is pinned by record_write once it actually writes.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary, they are never migrated on their own.
+        return db == DEFAULT_DB_ALIAS
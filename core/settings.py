@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+from datetime import datetime, timezone
 from pathlib import Path
 import os
 
@@ -40,12 +41,18 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     # user apps:
+    'core.apps.CoreConfig',
     'blog.apps.BlogConfig',
     "accounts.apps.AccountsConfig",
 ]
 
 MIDDLEWARE = [
+    # First, so the latency and the profile cover every other middleware.
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Outside of the session middleware, so it sees the session being saved.
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,7 +68,8 @@ ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # django.template.backends.django.DjangoTemplates timing the renders.
+        'BACKEND': 'core.backends.templates.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,6 +82,8 @@ TEMPLATES = [
                 # user context_processors
                 'blog.context_processors.get_categories',
                 'blog.context_processors.get_author',
+                'blog.context_processors.get_navigation_version',
+                'blog.context_processors.get_archive_months',
             ],
         },
     },
@@ -87,8 +97,47 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 with the transaction_mode option backported,
+        # write views begin IMMEDIATE transactions through core.sqlite.retry_on_lock.
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {},
+    }
+}
+
+# Read replicas
+# core.routers sends writes to default and spreads the reads of requests over
+# DATABASE_REPLICAS, except after the request or, for DATABASE_REPLICA_PIN_SECONDS,
+# the client wrote. To try it locally, list SQLite files in SQLITE_REPLICAS
+# (comma separated) and copy the primary into them with sync_replicas.
+
+for index, path in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        # Replicas are only read, their transactions never need the write lock.
+        'OPTIONS': {key: value for key, value in DATABASES['default']['OPTIONS'].items()
+                    if key != 'transaction_mode'},
+        'NAME': BASE_DIR / path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Sessions are read on every request and must not lag behind a login.
+DATABASE_PRIMARY_APPS = ['sessions']
+DATABASE_REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# The local-memory cache is per process; use a shared backend such as Redis or
+# Memcached when running several workers, so invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog',
+        'TIMEOUT': 300,
     }
 }
 
@@ -140,4 +189,82 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# SQLite tuning
+# Applied by core.sqlite to every new connection. WAL lets readers run during a
+# write, synchronous=NORMAL is durable across application crashes in WAL mode,
+# busy_timeout (ms) waits for locks instead of failing, mmap_size (bytes) and
+# cache_size (negative: KiB) keep hot pages in memory. Write views begin
+# IMMEDIATE transactions with SQLITE_IMMEDIATE_WRITES and retry up to
+# SQLITE_LOCK_RETRIES times when busy_timeout runs out.
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32 * 1024,
+    'temp_store': 'memory',
+}
+SQLITE_IMMEDIATE_WRITES = True
+SQLITE_LOCK_RETRIES = 5
+
+# Query budgets
+# core.middleware.RequestProfileMiddleware counts the queries of every request
+# and logs a warning when a view, by URL name, runs more than its budget ('*'
+# for the views not listed). Budgets allow for cold caches. With
+# QUERY_BUDGETS_STRICT=1 in the environment the request fails instead, e.g.
+# to catch regressions on a development server; tests override it.
+
+QUERY_BUDGETS = {
+    '*': 20,
+    'blog:post_list': 10,
+    'blog:post_category': 10,
+    'blog:post_author': 10,
+    'blog:post_period': 10,
+    'blog:post_archive': 10,
+    'blog:post_trending': 10,
+    'blog:post_discussed': 10,
+    'blog:post_detail': 12,
+    'blog:post_comments': 7,
+    'blog:search_posts': 11,
+    'accounts:profile_detail': 11,
+    'api_v1:post_list': 7,
+    'api_v1:post_detail': 7,
+    'api_v1:post_comments': 8,
+}
+QUERY_BUDGETS_STRICT = os.environ.get('QUERY_BUDGETS_STRICT', '0') == '1'
+
+# Blog lists
+# Page size of the post lists and the search results.
+
+BLOG_POSTS_PER_PAGE = 2
+
+# Blog rankings
+# Event weights grow as 2 ** (hours since the epoch / half life). Scores store
+# log2 of their sums, so they grow linearly and the epoch never has to move.
+
+BLOG_RANKING_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+BLOG_RANKING_HALF_LIFE = {
+    'trending': 48,
+    'discussion': 24 * 7,
+}
+
+# Async views
+# The read-only views have async versions, routed to when BLOG_ASYNC_VIEWS=1.
+# Set it for ASGI deployments only, under WSGI they would only add an event loop per request.
+
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS', '0') == '1'
+
+# core.backends.mail times the sends of EMAIL_DELIVERY_BACKEND for the metrics.
+EMAIL_BACKEND = 'core.backends.mail.EmailBackend'
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Metrics
+# Exposed at /metrics to staff users and to scrapers connecting from
+# METRICS_ALLOWED_ADDRESSES. With several worker processes, point
+# METRICS_MULTIPROCESS_DIR to a directory shared by all of them and empty it on
+# restart, every worker then answers with the totals of all workers.
+
+METRICS_ALLOWED_ADDRESSES = ['127.0.0.1', '::1']
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
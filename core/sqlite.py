@@ -0,0 +1,116 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+# Retries of a write view that hit a lock, waits grow from BASE to MAX seconds.
+DEFAULT_LOCK_RETRIES = 5
+LOCK_RETRY_BASE_DELAY = 0.01
+LOCK_RETRY_MAX_DELAY = 0.5
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    Apply the SQLITE_PRAGMAS setting to a new SQLite connection.
+
+    Receiver of connection_created, other database vendors are left alone.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_lock_error(error):
+    """
+    Tell whether an OperationalError means another connection holds the lock.
+    """
+    return 'locked' in str(error)
+
+
+@contextmanager
+def immediate_atomic(using=None):
+    """
+    Context manager like transaction.atomic() whose transaction takes the write lock when it begins.
+
+    Read-only transactions stay deferred, so they never wait for writers.
+    Inside an outer transaction it is a savepoint, as with atomic().
+    Needs the core.backends.sqlite3 backend, other backends begin as usual.
+
+    Args:
+        using (str): Database alias, the default one if omitted.
+    """
+    connection = transaction.get_connection(using)
+    connection.begin_immediate = True
+    try:
+        with transaction.atomic(using):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
+
+
+def _queued_messages(request):
+    """
+    Return the list of messages the request queued so far, None without the messages middleware.
+    """
+    return getattr(getattr(request, '_messages', None), '_queued_messages', None)
+
+
+def retry_on_lock(view_func=None, methods=None):
+    """
+    Decorator running a write view in a transaction, retried while the database is locked.
+
+    The transaction begins in IMMEDIATE mode unless SQLITE_IMMEDIATE_WRITES
+    is off, and waits up to busy_timeout for the write lock. Under heavy
+    contention or with deferred transactions it may still fail. The
+    whole view is then rolled back and run again after a random wait of up
+    to LOCK_RETRY_BASE_DELAY * 2 ** attempt seconds (exponential backoff
+    with full jitter), so competing writers do not retry in step.
+    Messages queued by a failed attempt are dropped before the next one.
+    The number of retries comes from the SQLITE_LOCK_RETRIES setting.
+
+    Args:
+        view_func: The view function to decorate.
+        methods (tuple): HTTP methods that write, e.g. ('POST',) for a view
+            rendering its form on GET. Requests with other methods run
+            without a transaction and do not take the write lock.
+            None runs every request in the transaction.
+
+    Returns:
+        function: The decorated view function.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if methods is not None and request.method not in methods:
+                return view_func(request, *args, **kwargs)
+            if transaction.get_connection().in_atomic_block:
+                # An outer transaction can not be replayed from here.
+                return view_func(request, *args, **kwargs)
+
+            retries = getattr(settings, 'SQLITE_LOCK_RETRIES', DEFAULT_LOCK_RETRIES)
+            immediate = getattr(settings, 'SQLITE_IMMEDIATE_WRITES', True)
+            queued = _queued_messages(request)
+            kept = list(queued) if queued is not None else None
+            for attempt in range(retries + 1):
+                try:
+                    with immediate_atomic() if immediate else transaction.atomic():
+                        return view_func(request, *args, **kwargs)
+                except OperationalError as error:
+                    if attempt == retries or not is_lock_error(error):
+                        raise
+                if queued is not None:
+                    queued[:] = kept
+                time.sleep(random.uniform(0, min(LOCK_RETRY_MAX_DELAY, LOCK_RETRY_BASE_DELAY * 2 ** attempt)))
+
+        return wrapper
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
@@ -17,11 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from . import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('blog.urls', namespace='blog')),
     path('accounts/', include('accounts.urls', namespace='accounts')),
+    path('api/v1/', include('blog.api_urls', namespace='api_v1')),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
 
 
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from . import metrics
+
+DEFAULT_METRICS_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def _is_local(request):
+    # A request forwarded by a local proxy comes from elsewhere.
+    if 'HTTP_X_FORWARDED_FOR' in request.META:
+        return False
+    addresses = getattr(settings, 'METRICS_ALLOWED_ADDRESSES', DEFAULT_METRICS_ADDRESSES)
+    return request.META.get('REMOTE_ADDR') in addresses
+
+
+def metrics_view(request):
+    """
+    Expose the metrics of all worker processes in the Prometheus text format.
+
+    Only staff users and scrapers connecting from METRICS_ALLOWED_ADDRESSES
+    may read them.
+
+    Args:
+        request: HttpRequest object representing the current request.
+
+    Returns:
+        HttpResponse: The metrics as text/plain.
+
+    Raises:
+        PermissionDenied: If the request is neither local nor from a staff user.
+    """
+    if not (_is_local(request) or request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
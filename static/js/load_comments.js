@@ -0,0 +1,24 @@
+document.addEventListener('click', function (event) {
+    const link = event.target.closest('[data-comments-url]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+
+    fetch(link.dataset.commentsUrl, {credentials: 'same-origin'})
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.text();
+        })
+        .then(function (html) {
+            // The fragment brings its own "load more" link for the following page.
+            const wrapper = link.parentElement;
+            wrapper.insertAdjacentHTML('beforebegin', html);
+            wrapper.remove();
+        })
+        .catch(function () {
+            window.location.href = link.href;
+        });
+});
@@ -0,0 +1,51 @@
+function getCookie(name) {
+    const cookie = document.cookie
+        .split(';')
+        .map(function (item) { return item.trim(); })
+        .find(function (item) { return item.startsWith(name + '='); });
+    return cookie ? decodeURIComponent(cookie.slice(name.length + 1)) : null;
+}
+
+function updateVotes(container, data) {
+    const state = {
+        like: {active: data.liked, count: data.likes, labels: ['Like', 'Unlike']},
+        dislike: {active: data.disliked, count: data.dislikes, labels: ['Dislike', 'Undislike']}
+    };
+
+    Object.keys(state).forEach(function (kind) {
+        const item = state[kind];
+        container.querySelector('[data-vote-label="' + kind + '"]').textContent = item.labels[item.active ? 1 : 0];
+        container.querySelector('[data-vote-count="' + kind + '"]').textContent = item.count;
+
+        const icon = container.querySelector('[data-vote-icon="' + kind + '"]');
+        icon.classList.toggle('fa-solid', item.active);
+        icon.classList.toggle('fa-regular', !item.active);
+    });
+}
+
+document.addEventListener('click', function (event) {
+    const link = event.target.closest('[data-vote-url]');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+
+    fetch(link.dataset.voteUrl, {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: {'X-CSRFToken': getCookie('csrftoken')}
+    })
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.json();
+        })
+        .then(function (data) {
+            updateVotes(link.closest('[data-votes]'), data);
+        })
+        .catch(function () {
+            // Fall back to the redirecting endpoint, e.g. to log in.
+            window.location.href = link.href;
+        });
+});